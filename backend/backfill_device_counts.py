@@ -0,0 +1,64 @@
+"""
+Backfill the denormalized device counters on every house
+Counts devices per house from the Devices table and sets total_devices and
+active_devices on each house item. Run once after deploying the counters,
+ideally while no devices are being added, removed or changing status.
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent))
+
+from core.database import get_table, Tables, count_devices_by_house
+from botocore.exceptions import ClientError
+
+def backfill_device_counts():
+    """Set total_devices/active_devices on every house from a count of its devices"""
+    
+    print("=" * 70)
+    print("🔢 House Device Count Backfill")
+    print("=" * 70)
+    print()
+    
+    try:
+        print("📡 Counting devices per house...")
+        device_counts = count_devices_by_house()
+        
+        houses_table = get_table(Tables.HOUSES)
+        scan_kwargs = {'ProjectionExpression': 'house_id'}
+        updated = 0
+        
+        while True:
+            scan_response = houses_table.scan(**scan_kwargs)
+            
+            for item in scan_response.get('Items', []):
+                house_id = item['house_id']
+                total, active = device_counts.get(house_id, (0, 0))
+                
+                houses_table.update_item(
+                    Key={'house_id': house_id},
+                    UpdateExpression='SET total_devices = :total, active_devices = :active',
+                    ConditionExpression='attribute_exists(house_id)',
+                    ExpressionAttributeValues={':total': total, ':active': active}
+                )
+                print(f"   • {house_id}: {total} device(s), {active} online")
+                updated += 1
+            
+            if 'LastEvaluatedKey' not in scan_response:
+                break
+            scan_kwargs['ExclusiveStartKey'] = scan_response['LastEvaluatedKey']
+        
+        print()
+        print(f"✅ Backfilled device counts for {updated} house(s)")
+        
+    except ClientError as e:
+        print()
+        print("=" * 70)
+        print("❌ Error backfilling device counts")
+        print("=" * 70)
+        print(f"Error: {str(e)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    backfill_device_counts()
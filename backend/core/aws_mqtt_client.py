@@ -3,6 +3,8 @@ AWS IoT MQTT Client using AWS IoT SDK
 Properly handles AWS IoT Core communication for receiving device messages
 """
 import json
+import base64
+import struct
 import logging
 import asyncio
 from datetime import datetime
@@ -13,7 +15,7 @@ from awscrt import mqtt
 from awsiot import mqtt_connection_builder
 
 from core.websocket_manager import manager as connection_manager
-from core.database import get_table, Tables
+from core.database import get_table, Tables, adjust_house_device_counts
 from botocore.exceptions import ClientError
 
 # Configure logging
@@ -23,6 +25,86 @@ logger = logging.getLogger(__name__)
 # Thread pool for async task execution
 executor = ThreadPoolExecutor(max_workers=10)
 
+# Binary device messages (must match iot_device/device.py):
+# magic + 4-byte big-endian header length + JSON header + raw JPEG/audio bytes
+BINARY_PAYLOAD_MAGIC = b'SHB1'
+BINARY_HEADER_LENGTH = struct.Struct('>I')
+
+ULAW_BIAS = 0x84
+
+
+def _ulaw_byte_to_pcm16(value: int) -> bytes:
+    """Decode one G.711 mu-law byte to a little-endian PCM16 sample"""
+    value = ~value & 0xFF
+    exponent = (value >> 4) & 0x07
+    mantissa = value & 0x0F
+    magnitude = (((mantissa << 3) + ULAW_BIAS) << exponent) - ULAW_BIAS
+    sample = -magnitude if value & 0x80 else magnitude
+    return sample.to_bytes(2, 'little', signed=True)
+
+
+# mu-law byte -> PCM16 bytes lookup table
+ULAW_TO_PCM16 = [_ulaw_byte_to_pcm16(value) for value in range(256)]
+
+
+def decode_ulaw(data) -> bytes:
+    """
+    Expand G.711 mu-law audio to PCM16
+    
+    Args:
+        data: mu-law bytes (one per sample)
+        
+    Returns:
+        bytes: Little-endian PCM16 samples
+    """
+    return b''.join([ULAW_TO_PCM16[value] for value in data])
+
+
+def decode_device_payload(payload: bytes) -> dict:
+    """
+    Parse a device message into the JSON message shape
+    
+    Binary messages carry raw media after a JSON header. The media is
+    base64-encoded into the field named by the header's `payload_field`,
+    so processing and WebSocket clients see the same shape as JSON messages.
+    
+    Args:
+        payload: Raw MQTT payload
+        
+    Returns:
+        dict: Message data
+        
+    Raises:
+        ValueError: If the payload is malformed
+    """
+    if not payload.startswith(BINARY_PAYLOAD_MAGIC):
+        return json.loads(payload)
+    
+    header_start = len(BINARY_PAYLOAD_MAGIC) + BINARY_HEADER_LENGTH.size
+    if len(payload) < header_start:
+        raise ValueError("Truncated binary payload header")
+    
+    (header_length,) = BINARY_HEADER_LENGTH.unpack_from(payload, len(BINARY_PAYLOAD_MAGIC))
+    data_start = header_start + header_length
+    
+    message_data = json.loads(payload[header_start:data_start])
+    media = memoryview(payload)[data_start:]
+    
+    payload_field = message_data.pop('payload_field', 'image')
+    if payload_field == 'audio':
+        audio = message_data.setdefault('audio', {})
+        
+        # Browsers play PCM16; expand mu-law here so clients need no decoder
+        if audio.get('format') == 'ulaw8':
+            media = decode_ulaw(media)
+            audio['format'] = 'pcm16'
+        
+        audio['data'] = base64.b64encode(media).decode('ascii')
+    else:
+        message_data[payload_field] = base64.b64encode(media).decode('ascii')
+    
+    return message_data
+
 
 class AWSIoTMQTTClient:
     """
@@ -101,16 +183,13 @@ class AWSIoTMQTTClient:
             retain: Retain flag
         """
         try:
-            # Decode payload
-            payload_str = payload.decode('utf-8')
-            
             logger.info(f"📨 Received message on topic: {topic}")
-            logger.info(f"📦 Payload size: {len(payload_str)} bytes")
+            logger.info(f"📦 Payload size: {len(payload)} bytes")
             
-            # Parse JSON
+            # Parse JSON or binary payload
             try:
-                message_data = json.loads(payload_str)
-                logger.info(f"✅ Parsed JSON. Keys: {list(message_data.keys())}")
+                message_data = decode_device_payload(payload)
+                logger.info(f"✅ Parsed payload. Keys: {list(message_data.keys())}")
                 
                 # Extract device_id
                 device_id = message_data.get('device_id')
@@ -130,9 +209,9 @@ class AWSIoTMQTTClient:
                     self.event_loop
                 )
                 
-            except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse JSON payload: {e}")
-                logger.error(f"Payload preview: {payload_str[:200]}")
+            except ValueError as e:
+                logger.error(f"Failed to parse payload: {e}")
+                logger.error(f"Payload preview: {payload[:200]!r}")
                 
         except Exception as e:
             logger.error(f"Error in on_message_received: {e}", exc_info=True)
@@ -202,7 +281,7 @@ class AWSIoTMQTTClient:
             
             # Update device status
             now = datetime.now().isoformat()
-            devices_table.update_item(
+            update_response = devices_table.update_item(
                 Key={'device_id': device_id},
                 UpdateExpression='SET #status = :status, last_seen = :last_seen, updated_at = :updated_at',
                 ExpressionAttributeNames={'#status': 'status'},
@@ -210,9 +289,16 @@ class AWSIoTMQTTClient:
                     ':status': 'online',
                     ':last_seen': now,
                     ':updated_at': now
-                }
+                },
+                # ALL_OLD: UPDATED_OLD may omit a status SET to its current value
+                ReturnValues='ALL_OLD'
             )
             
+            # Only the message that actually flips the device online bumps the counter
+            previous_status = update_response.get('Attributes', {}).get('status')
+            if previous_status != 'online':
+                adjust_house_device_counts(response['Item']['house_id'], active_delta=1)
+            
             logger.debug(f"Updated device {device_id} status to online")
             
         except ClientError as e:
@@ -0,0 +1,115 @@
+"""
+Redis cache-aside helpers
+Caching is optional: when REDIS_URL is not configured every lookup is a miss
+and every write is a no-op, so routes behave exactly as without a cache.
+"""
+import logging
+from typing import Optional
+
+import redis.asyncio as redis
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Global Redis client (None when caching is disabled)
+redis_client: Optional[redis.Redis] = None
+
+
+def initialize_cache(url: str, max_connections: int = 20):
+    """
+    Create the shared Redis connection pool
+
+    Args:
+        url: Redis URL (e.g., redis://localhost:6379/0)
+        max_connections: Maximum pooled connections
+    """
+    global redis_client
+
+    redis_client = redis.Redis.from_url(url, max_connections=max_connections)
+    logger.info(f"✅ Redis cache initialized: {url}")
+
+    return redis_client
+
+
+async def shutdown_cache():
+    """Close the shared Redis connection pool"""
+    global redis_client
+
+    if redis_client is not None:
+        await redis_client.aclose()
+        redis_client = None
+        logger.info("✅ Redis cache shut down")
+
+
+async def cache_get(key: str) -> Optional[bytes]:
+    """
+    Read a cached value
+
+    Args:
+        key: Cache key
+
+    Returns:
+        Optional[bytes]: Cached bytes, or None on miss / cache unavailable
+    """
+    if redis_client is None:
+        return None
+
+    try:
+        return await redis_client.get(key)
+    except redis.RedisError as e:
+        logger.warning(f"Cache read failed for {key}: {e}")
+        return None
+
+
+async def cache_set(key: str, value: bytes, ttl_seconds: int):
+    """
+    Store a value with an expiry
+
+    Args:
+        key: Cache key
+        value: Serialized value
+        ttl_seconds: Time to live in seconds
+    """
+    if redis_client is None:
+        return
+
+    try:
+        await redis_client.setex(key, ttl_seconds, value)
+    except redis.RedisError as e:
+        logger.warning(f"Cache write failed for {key}: {e}")
+
+
+async def cache_delete(*keys: str):
+    """
+    Invalidate one or more keys
+
+    Args:
+        keys: Cache keys to delete
+    """
+    if redis_client is None or not keys:
+        return
+
+    try:
+        await redis_client.delete(*keys)
+    except redis.RedisError as e:
+        logger.warning(f"Cache delete failed for {keys}: {e}")
+
+
+async def cache_delete_pattern(pattern: str):
+    """
+    Invalidate every key matching a glob pattern
+
+    Uses SCAN rather than KEYS so large keyspaces don't block Redis.
+
+    Args:
+        pattern: Glob pattern (e.g., "alerts:*")
+    """
+    if redis_client is None:
+        return
+
+    try:
+        keys = [key async for key in redis_client.scan_iter(match=pattern, count=500)]
+        if keys:
+            await redis_client.delete(*keys)
+    except redis.RedisError as e:
+        logger.warning(f"Cache delete failed for pattern {pattern}: {e}")
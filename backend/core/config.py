@@ -33,6 +33,10 @@ class Settings(BaseSettings):
     # DynamoDB Settings
     dynamodb_endpoint_url: Optional[str] = None  # For local development: http://localhost:8000
     
+    # Cache Settings
+    redis_url: Optional[str] = None  # e.g., redis://localhost:6379/0 - caching disabled when unset
+    cache_ttl_seconds: int = 30
+    
     # CORS Settings
     cors_origins: str = "*"  # Change to string, will split in main.py
     
@@ -2,21 +2,37 @@
 DynamoDB connection and utility functions
 """
 import boto3
+import base64
+import json
+import logging
+import time
+from botocore.config import Config
 from botocore.exceptions import ClientError
-from typing import Optional
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Iterable, Tuple
 from core.config import settings
 
-# Initialize DynamoDB resource
-def get_dynamodb_resource():
+logger = logging.getLogger(__name__)
+
+# Shared HTTP settings: a pool large enough for concurrent handlers, kept-alive
+# connections so requests skip the TCP/TLS handshake, adaptive retries on throttling
+BOTO_CONFIG = Config(
+    max_pool_connections=50,
+    tcp_keepalive=True,
+    retries={'max_attempts': 3, 'mode': 'adaptive'}
+)
+
+def _connection_kwargs() -> dict:
     """
-    Get DynamoDB resource
+    Build the boto3 connection arguments from settings
     
     Returns:
-        boto3.resource: DynamoDB resource
+        dict: Keyword arguments for boto3.resource / boto3.client
     """
-    # Only use endpoint_url if it's actually set (not empty string)
     kwargs = {
         'region_name': settings.AWS_REGION,
+        'config': BOTO_CONFIG,
     }
     
     if settings.AWS_ACCESS_KEY_ID:
@@ -29,31 +45,32 @@ def get_dynamodb_resource():
     if settings.dynamodb_endpoint_url and settings.dynamodb_endpoint_url.strip():
         kwargs['endpoint_url'] = settings.dynamodb_endpoint_url
     
-    return boto3.resource('dynamodb', **kwargs)
+    return kwargs
 
+# Initialize DynamoDB resource
+@lru_cache(maxsize=None)
+def get_dynamodb_resource():
+    """
+    Get the shared DynamoDB resource
+    
+    Built once per process so every caller reuses the same connection pool.
+    
+    Returns:
+        boto3.resource: DynamoDB resource
+    """
+    return boto3.resource('dynamodb', **_connection_kwargs())
+
+@lru_cache(maxsize=None)
 def get_dynamodb_client():
     """
-    Get DynamoDB client
+    Get the shared DynamoDB client
     
     Returns:
         boto3.client: DynamoDB client
     """
-    kwargs = {
-        'region_name': settings.AWS_REGION,
-    }
-    
-    if settings.AWS_ACCESS_KEY_ID:
-        kwargs['aws_access_key_id'] = settings.AWS_ACCESS_KEY_ID
-    
-    if settings.AWS_SECRET_ACCESS_KEY:
-        kwargs['aws_secret_access_key'] = settings.AWS_SECRET_ACCESS_KEY
-    
-    # Only add endpoint_url if it's not None and not empty string
-    if settings.dynamodb_endpoint_url and settings.dynamodb_endpoint_url.strip():
-        kwargs['endpoint_url'] = settings.dynamodb_endpoint_url
-    
-    return boto3.client('dynamodb', **kwargs)
+    return boto3.client('dynamodb', **_connection_kwargs())
 
+@lru_cache(maxsize=None)
 def get_table(table_name: str):
     """
     Get a specific DynamoDB table
@@ -62,14 +79,218 @@ def get_table(table_name: str):
         table_name: Name of the table
         
     Returns:
-        boto3.resource.Table: DynamoDB table resource
+        boto3.resource.Table: DynamoDB table resource (cached per table name)
     """
     dynamodb = get_dynamodb_resource()
     return dynamodb.Table(table_name)
 
+def warm_dynamodb_connection():
+    """
+    Open the first pooled HTTPS connection with a cheap DescribeTable call
+    
+    Moves the cold TCP/TLS handshake and credential resolution to startup
+    instead of the first user request.
+    """
+    try:
+        get_dynamodb_resource().meta.client.describe_table(TableName=Tables.DEVICES)
+        logger.info("✅ DynamoDB connection warmed")
+    except ClientError as e:
+        logger.warning(f"⚠️ DynamoDB warm-up failed: {e}")
+
 # Table name constants
 class Tables:
     USERS = "Users"  # Lowercase to match AWS table
     HOUSES = "Houses"
     DEVICES = "Devices"
-    ALERTS = "Alerts"
\ No newline at end of file
+    ALERTS = "Alerts"
+
+# Global secondary index name constants
+class Indexes:
+    USERS_BY_EMAIL = "email-index"                  # Users: email (HASH)
+    ALERTS_BY_HOUSE = "house_id-timestamp-index"    # Alerts: house_id (HASH), timestamp (RANGE)
+    ALERTS_BY_DEVICE = "device_id-timestamp-index"  # Alerts: device_id (HASH), timestamp (RANGE)
+
+def encode_cursor(last_evaluated_key: Optional[dict]) -> Optional[str]:
+    """
+    Encode a DynamoDB LastEvaluatedKey as an opaque URL-safe pagination cursor
+    
+    Args:
+        last_evaluated_key: LastEvaluatedKey from a scan/query response
+        
+    Returns:
+        Optional[str]: Cursor string, or None when there are no more pages
+    """
+    if not last_evaluated_key:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(last_evaluated_key).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor: str) -> dict:
+    """
+    Decode a pagination cursor back into a DynamoDB ExclusiveStartKey
+    
+    Args:
+        cursor: Cursor previously returned by encode_cursor
+        
+    Returns:
+        dict: ExclusiveStartKey for the next scan/query
+        
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+    if not isinstance(key, dict):
+        raise ValueError("Invalid cursor")
+    return key
+
+# DynamoDB caps a single BatchGetItem request at 100 keys
+BATCH_GET_MAX_KEYS = 100
+
+# Upper bound on BatchGetItem chunks issued in parallel
+BATCH_GET_MAX_WORKERS = 10
+
+# Retries for UnprocessedKeys (throttling), with exponential backoff from the base delay
+BATCH_GET_MAX_RETRIES = 5
+BATCH_GET_RETRY_BASE_DELAY = 0.05  # seconds
+
+def batch_get_items(table_name: str, key_name: str, key_values: Iterable[str]) -> Dict[str, dict]:
+    """
+    Fetch many items by partition key using BatchGetItem
+    
+    Keys are de-duplicated and sent in chunks of 100, so N lookups cost
+    ceil(N / 100) requests instead of N; multiple chunks are issued in
+    parallel, so wall time stays close to a single round-trip. Unprocessed
+    keys returned under throttling are retried with exponential backoff, up
+    to BATCH_GET_MAX_RETRIES times.
+    
+    Args:
+        table_name: Name of the table
+        key_name: Name of the partition key attribute
+        key_values: Partition key values to look up
+        
+    Returns:
+        Dict mapping each found key value to its item (missing keys are absent)
+        
+    Raises:
+        ClientError: If keys are still unprocessed after the last retry
+    """
+    dynamodb = get_dynamodb_resource()
+    unique_values = list(dict.fromkeys(key_values))
+    chunks = [
+        unique_values[start:start + BATCH_GET_MAX_KEYS]
+        for start in range(0, len(unique_values), BATCH_GET_MAX_KEYS)
+    ]
+    
+    def fetch_chunk(chunk_values):
+        chunk_items = []
+        request_items = {table_name: {'Keys': [{key_name: value} for value in chunk_values]}}
+        
+        for attempt in range(BATCH_GET_MAX_RETRIES + 1):
+            if attempt:
+                time.sleep(BATCH_GET_RETRY_BASE_DELAY * 2 ** (attempt - 1))
+            
+            response = dynamodb.batch_get_item(RequestItems=request_items)
+            chunk_items.extend(response.get('Responses', {}).get(table_name, []))
+            request_items = response.get('UnprocessedKeys')
+            if not request_items:
+                return chunk_items
+        
+        # Partial results would look like missing items, so fail instead
+        raise ClientError(
+            {'Error': {
+                'Code': 'ProvisionedThroughputExceededException',
+                'Message': f"Keys still unprocessed after {BATCH_GET_MAX_RETRIES} retries"
+            }},
+            'BatchGetItem'
+        )
+    
+    if len(chunks) <= 1:
+        chunk_results = [fetch_chunk(chunk) for chunk in chunks]
+    else:
+        with ThreadPoolExecutor(max_workers=min(len(chunks), BATCH_GET_MAX_WORKERS)) as pool:
+            chunk_results = list(pool.map(fetch_chunk, chunks))
+    
+    items = {}
+    for chunk_items in chunk_results:
+        for item in chunk_items:
+            items[item[key_name]] = item
+    
+    return items
+
+def adjust_house_device_counts(house_id: str, total_delta: int = 0, active_delta: int = 0):
+    """
+    Atomically adjust the denormalized device counters on a house item
+    
+    Uses DynamoDB's ADD action so concurrent device writes never lose an
+    update. The house must already exist and carry both counters; a missing
+    house is skipped rather than creating a stub item, and a house whose
+    counters were never backfilled is left alone so ADD can't start them
+    from 0 (list_houses counts such houses directly until
+    backfill_device_counts.py has run).
+    
+    Args:
+        house_id: ID of the house owning the device
+        total_delta: Change to apply to total_devices
+        active_delta: Change to apply to active_devices
+    """
+    add_expressions = []
+    expression_attribute_values = {}
+    
+    if total_delta:
+        add_expressions.append("total_devices :total")
+        expression_attribute_values[':total'] = total_delta
+    
+    if active_delta:
+        add_expressions.append("active_devices :active")
+        expression_attribute_values[':active'] = active_delta
+    
+    if not add_expressions:
+        return
+    
+    try:
+        get_table(Tables.HOUSES).update_item(
+            Key={'house_id': house_id},
+            UpdateExpression="ADD " + ", ".join(add_expressions),
+            ConditionExpression=(
+                'attribute_exists(house_id) AND attribute_exists(total_devices) '
+                'AND attribute_exists(active_devices)'
+            ),
+            ExpressionAttributeValues=expression_attribute_values
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            logger.debug(f"Skipped device counts for house {house_id}: missing or not backfilled")
+            return
+        
+        # Counters are derived data - never fail the device write because of them
+        logger.warning(f"Failed to update device counts for house {house_id}: {e}")
+
+def count_devices_by_house() -> Dict[str, Tuple[int, int]]:
+    """
+    Count devices per house with a projected scan of the devices table
+    
+    Source of truth for the denormalized house counters - used by the
+    backfill script and for houses whose counters were never set.
+    
+    Returns:
+        Dict mapping house_id to (total_devices, active_devices)
+    """
+    table = get_table(Tables.DEVICES)
+    scan_kwargs = {
+        'ProjectionExpression': 'house_id, #s',
+        'ExpressionAttributeNames': {'#s': 'status'},
+    }
+    
+    counts: Dict[str, Tuple[int, int]] = {}
+    while True:
+        response = table.scan(**scan_kwargs)
+        
+        for item in response.get('Items', []):
+            total, active = counts.get(item['house_id'], (0, 0))
+            counts[item['house_id']] = (total + 1, active + (item.get('status') == 'online'))
+        
+        if 'LastEvaluatedKey' not in response:
+            return counts
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
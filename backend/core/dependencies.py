@@ -1,11 +1,65 @@
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi import Depends, HTTPException, status
 from typing import Optional
-from jose import jwt, JWTError
+from collections import OrderedDict
+import hashlib
+import threading
+import time
+import jwt
 from core.config import settings
 
 security = HTTPBearer(auto_error=False)  # auto_error=False makes it optional
 
+# HMAC key material, encoded once instead of per token
+SECRET_KEY_BYTES = settings.secret_key.encode('utf-8')
+
+# Successful decodes cached by token hash: repeated requests with the same
+# bearer token skip signature verification until the entry's TTL or the
+# token's own expiry, whichever comes first
+TOKEN_CACHE_MAX_SIZE = 1024
+TOKEN_CACHE_TTL_SECONDS = 60
+_token_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_token_cache_lock = threading.Lock()
+
+def decode_token(token: str) -> dict:
+    """
+    Decode and verify a JWT, using the LRU cache of recent successful decodes
+    
+    Args:
+        token: Encoded JWT
+        
+    Returns:
+        dict: Decoded token payload
+        
+    Raises:
+        jwt.InvalidTokenError: If the token is invalid or expired
+    """
+    cache_key = hashlib.sha256(token.encode('utf-8')).hexdigest()
+    now = time.time()
+    
+    with _token_cache_lock:
+        cached = _token_cache.get(cache_key)
+        if cached is not None:
+            payload, valid_until = cached
+            if now < valid_until:
+                _token_cache.move_to_end(cache_key)
+                return payload
+            del _token_cache[cache_key]
+    
+    payload = jwt.decode(token, SECRET_KEY_BYTES, algorithms=[settings.algorithm])
+    
+    valid_until = now + TOKEN_CACHE_TTL_SECONDS
+    if 'exp' in payload:
+        valid_until = min(valid_until, float(payload['exp']))
+    
+    with _token_cache_lock:
+        _token_cache[cache_key] = (payload, valid_until)
+        _token_cache.move_to_end(cache_key)
+        while len(_token_cache) > TOKEN_CACHE_MAX_SIZE:
+            _token_cache.popitem(last=False)
+    
+    return payload
+
 async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
     """
     Verify JWT token and extract user information
@@ -29,13 +83,8 @@ async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(secur
     token = credentials.credentials
     
     try:
-        payload = jwt.decode(
-            token,
-            settings.secret_key,
-            algorithms=[settings.algorithm]
-        )
-        return payload
-    except JWTError:
+        return decode_token(token)
+    except jwt.InvalidTokenError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
@@ -56,14 +105,8 @@ async def optional_verify_token(credentials: Optional[HTTPAuthorizationCredentia
         return None
     
     try:
-        token = credentials.credentials
-        payload = jwt.decode(
-            token,
-            settings.secret_key,
-            algorithms=[settings.algorithm]
-        )
-        return payload
-    except JWTError:
+        return decode_token(credentials.credentials)
+    except jwt.InvalidTokenError:
         return None
 
 async def get_current_user(token_payload: dict = Depends(verify_token)) -> dict:
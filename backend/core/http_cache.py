@@ -0,0 +1,48 @@
+"""
+Conditional GET helpers (ETag / If-None-Match) for list endpoints
+"""
+import hashlib
+from typing import Iterable, Optional
+from fastapi import Request, Response, status
+
+
+def compute_etag(versions: Iterable) -> str:
+    """
+    Build a strong ETag from per-item version markers
+
+    Callers pass one marker per item (e.g. id + updated_at), so adds,
+    deletes and edits all change the tag without hashing the full payload.
+
+    Args:
+        versions: Iterable of hashable version markers, one per item
+
+    Returns:
+        str: Quoted ETag header value
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for version in sorted(str(v) for v in versions):
+        digest.update(version.encode('utf-8'))
+        digest.update(b'\0')
+    return f'"{digest.hexdigest()}"'
+
+
+def not_modified_response(request: Request, etag: str) -> Optional[Response]:
+    """
+    Return a 304 response if the client already holds the current representation
+
+    Args:
+        request: Incoming request carrying an optional If-None-Match header
+        etag: Current ETag of the resource
+
+    Returns:
+        Optional[Response]: 304 response when the ETag matches, otherwise None
+    """
+    if_none_match = request.headers.get('if-none-match')
+    if not if_none_match:
+        return None
+
+    candidates = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+    if etag in candidates or '*' in candidates:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+    return None
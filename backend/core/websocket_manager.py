@@ -3,15 +3,84 @@ WebSocket Connection Manager for Smart Home IoT System
 Handles WebSocket connections, device subscriptions, and message broadcasting
 """
 from fastapi import WebSocket, WebSocketDisconnect
-from typing import Dict, Set, List
-import json
+from typing import Dict, Set, List, Iterable
+import asyncio
+import contextlib
 import logging
+import time
+import orjson
 from datetime import datetime
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Max time a single client may take to accept a broadcast frame
+SEND_TIMEOUT_SECONDS = 1.0
+
+# Broadcast frames buffered per connection; the oldest is dropped on overflow
+OUTGOING_QUEUE_SIZE = 100
+
+# Per-connection inbound message rate limit (sustained messages/sec and burst)
+CLIENT_MESSAGE_RATE = 50
+CLIENT_MESSAGE_BURST = 100
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter
+    
+    Refills continuously at `rate` tokens per second up to `burst` tokens;
+    each message consumes one token.
+    """
+    
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+    
+    def consume(self) -> bool:
+        """
+        Take one token if available
+        
+        Returns:
+            True if the message is allowed, False if the client is over its limit
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        
+        if self.tokens < 1:
+            return False
+        
+        self.tokens -= 1
+        return True
+
+
+def encode_message(message) -> str:
+    """
+    Serialize a message for a WebSocket text frame using orjson
+    
+    Args:
+        message: Message to serialize
+        
+    Returns:
+        JSON text
+    """
+    return orjson.dumps(message).decode('utf-8')
+
+
+async def send_message(websocket: WebSocket, message: dict):
+    """
+    Send a message as a JSON text frame (orjson-encoded)
+    
+    Args:
+        websocket: Connection to send to
+        message: Message to send
+    """
+    await websocket.send_text(encode_message(message))
+
 
 class ConnectionManager:
     """
@@ -24,6 +93,13 @@ class ConnectionManager:
         
         # Maps device_id to set of WebSocket connections subscribed to that device
         self.device_subscriptions: Dict[str, Set[WebSocket]] = {}
+        
+        # Maps each connection to its inbound rate limiter
+        self.rate_limiters: Dict[WebSocket, TokenBucket] = {}
+        
+        # Maps each connection to its outgoing broadcast queue and writer task
+        self.outgoing_queues: Dict[WebSocket, asyncio.Queue] = {}
+        self.writer_tasks: Dict[WebSocket, asyncio.Task] = {}
     
     async def connect(self, websocket: WebSocket):
         """
@@ -34,6 +110,13 @@ class ConnectionManager:
         """
         await websocket.accept()
         self.active_connections.append(websocket)
+        self.rate_limiters[websocket] = TokenBucket(CLIENT_MESSAGE_RATE, CLIENT_MESSAGE_BURST)
+        
+        # Broadcasts are queued per connection and drained by a dedicated writer,
+        # so a slow client only ever delays its own frames
+        queue = asyncio.Queue(maxsize=OUTGOING_QUEUE_SIZE)
+        self.outgoing_queues[websocket] = queue
+        self.writer_tasks[websocket] = asyncio.create_task(self._writer(websocket, queue))
         logger.info(f"WebSocket connected. Total connections: {len(self.active_connections)}")
     
     def disconnect(self, websocket: WebSocket):
@@ -46,6 +129,13 @@ class ConnectionManager:
         # Remove from active connections
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
+        self.rate_limiters.pop(websocket, None)
+        self.outgoing_queues.pop(websocket, None)
+        
+        # Stop the writer (unless we're being called from it)
+        writer_task = self.writer_tasks.pop(websocket, None)
+        if writer_task is not None and writer_task is not asyncio.current_task():
+            writer_task.cancel()
         
         # Remove from all device subscriptions
         devices_to_remove = []
@@ -62,6 +152,20 @@ class ConnectionManager:
         
         logger.info(f"WebSocket disconnected. Total connections: {len(self.active_connections)}")
     
+    def allow_message(self, websocket: WebSocket) -> bool:
+        """
+        Check a client message against the connection's rate limit
+        
+        Args:
+            websocket: Connection the message arrived on
+            
+        Returns:
+            True if the message should be processed (False for connections
+            that have already been disconnected)
+        """
+        bucket = self.rate_limiters.get(websocket)
+        return bucket is not None and bucket.consume()
+    
     async def subscribe(self, websocket: WebSocket, device_id: str):
         """
         Subscribe a WebSocket connection to a specific device
@@ -81,7 +185,7 @@ class ConnectionManager:
         )
         
         # Send confirmation to client
-        await websocket.send_json({
+        await send_message(websocket, {
             "type": "subscription_confirmed",
             "device_id": device_id,
             "timestamp": datetime.now().isoformat()
@@ -105,12 +209,66 @@ class ConnectionManager:
             logger.info(f"WebSocket unsubscribed from device: {device_id}")
             
             # Send confirmation to client
-            await websocket.send_json({
+            await send_message(websocket, {
                 "type": "unsubscription_confirmed",
                 "device_id": device_id,
                 "timestamp": datetime.now().isoformat()
             })
     
+    async def _writer(self, websocket: WebSocket, queue: asyncio.Queue):
+        """
+        Drain a connection's outgoing queue onto the socket
+        
+        Each send is bounded by SEND_TIMEOUT_SECONDS; a client that fails or
+        stalls is disconnected and its socket closed, which also ends the
+        endpoint's receive loop.
+        
+        Args:
+            websocket: Connection to write to
+            queue: Queue of pre-serialized frames for this connection
+        """
+        try:
+            while True:
+                text = await queue.get()
+                await asyncio.wait_for(websocket.send_text(text), timeout=SEND_TIMEOUT_SECONDS)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error sending to WebSocket: {e!r}")
+            self.disconnect(websocket)
+            
+            # 1011 = internal error; the socket may already be dead
+            with contextlib.suppress(Exception):
+                await websocket.close(code=1011)
+    
+    def _enqueue_many(self, websockets: Iterable[WebSocket], message: dict) -> int:
+        """
+        Queue a message for several connections without waiting on any of them
+        
+        Args:
+            websockets: Connections to send to
+            message: Message to send (will be JSON serialized)
+            
+        Returns:
+            Number of connections the message was queued for
+        """
+        # Serialize once, then queue the same text for every recipient
+        text = encode_message(message)
+        
+        queued = 0
+        for websocket in websockets:
+            queue = self.outgoing_queues.get(websocket)
+            if queue is None:
+                continue
+            
+            # Drop the oldest frame rather than block on a slow client
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(text)
+            queued += 1
+        
+        return queued
+    
     async def broadcast_to_device(self, device_id: str, message: dict):
         """
         Broadcast message to all subscribers of a specific device
@@ -123,27 +281,13 @@ class ConnectionManager:
             logger.debug(f"No subscribers for device: {device_id}")
             return
         
-        # Get subscribers for this device
-        subscribers = self.device_subscriptions[device_id].copy()
-        
-        # Track failed connections to remove them
-        failed_connections = []
+        subscribers = self.device_subscriptions[device_id]
         
-        for websocket in subscribers:
-            try:
-                await websocket.send_json(message)
-            except Exception as e:
-                logger.error(f"Error broadcasting to device {device_id}: {e}")
-                failed_connections.append(websocket)
+        # Hand the frame to each subscriber's writer; failed sockets are
+        # disconnected by their writer
+        queued = self._enqueue_many(subscribers, message)
         
-        # Clean up failed connections
-        for websocket in failed_connections:
-            self.disconnect(websocket)
-        
-        logger.info(
-            f"Broadcasted to device {device_id}: "
-            f"{len(subscribers) - len(failed_connections)}/{len(subscribers)} successful"
-        )
+        logger.info(f"Broadcasted to device {device_id}: queued for {queued}/{len(subscribers)}")
     
     async def broadcast_all(self, message: dict):
         """
@@ -152,24 +296,12 @@ class ConnectionManager:
         Args:
             message: Message to broadcast (will be JSON serialized)
         """
-        # Track failed connections to remove them
-        failed_connections = []
+        connections = self.active_connections
         
-        for websocket in self.active_connections.copy():
-            try:
-                await websocket.send_json(message)
-            except Exception as e:
-                logger.error(f"Error broadcasting to all: {e}")
-                failed_connections.append(websocket)
+        # Hand the frame to each connection's writer
+        queued = self._enqueue_many(connections, message)
         
-        # Clean up failed connections
-        for websocket in failed_connections:
-            self.disconnect(websocket)
-        
-        logger.info(
-            f"Broadcasted to all: "
-            f"{len(self.active_connections) - len(failed_connections)}/{len(self.active_connections)} successful"
-        )
+        logger.info(f"Broadcasted to all: queued for {queued}/{len(connections)}")
     
     def get_device_subscriber_count(self, device_id: str) -> int:
         """
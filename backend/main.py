@@ -1,13 +1,17 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from datetime import datetime
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 
 from core.config import settings
 from core.aws_mqtt_client import initialize_aws_mqtt_client, shutdown_aws_mqtt_client
+from core.cache import initialize_cache, shutdown_cache
+from core.database import warm_dynamodb_connection
 from core.error_handlers import (
     validation_exception_handler,
     http_exception_handler,
@@ -63,6 +67,18 @@ async def lifespan(app: FastAPI):
         logger.warning(f"⚠️ MQTT broker not available: {e}")
         logger.info("ℹ️  App will run without MQTT support (WebSocket still works)")
     
+    # Open the shared DynamoDB connection pool before the first request
+    try:
+        await asyncio.to_thread(warm_dynamodb_connection)
+    except Exception as e:
+        logger.warning(f"⚠️ DynamoDB not reachable at startup: {e}")
+    
+    # Initialize Redis cache
+    if settings.redis_url:
+        initialize_cache(settings.redis_url)
+    else:
+        logger.info("ℹ️  No REDIS_URL configured - response caching disabled")
+    
     logger.info("✅ Application startup complete")
     
     yield
@@ -76,6 +92,11 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"⚠️ Error shutting down MQTT client: {e}")
     
+    try:
+        await shutdown_cache()
+    except Exception as e:
+        logger.warning(f"⚠️ Error shutting down Redis cache: {e}")
+    
     logger.info("✅ Application shutdown complete")
 
 
@@ -93,6 +114,7 @@ def create_app() -> FastAPI:
         docs_url="/docs",
         redoc_url="/redoc",
         openapi_url="/openapi.json",
+        default_response_class=ORJSONResponse,
         lifespan=lifespan
     )
     
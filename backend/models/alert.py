@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
 from enum import Enum
@@ -17,6 +17,9 @@ class AlertResponse(BaseModel):
     timestamp: datetime
     is_read: bool
 
+class AlertBatchRequest(BaseModel):
+    alert_ids: List[str] = Field(..., max_length=1000)
+
 class AlertConfigUpdate(BaseModel):
     severity_threshold: Optional[str] = None
     notification_enabled: Optional[bool] = None
@@ -1,5 +1,10 @@
 from pydantic import BaseModel
+from typing import Optional, List
 
 class MessageResponse(BaseModel):
     message: str
     success: bool
+
+class PageResponse(BaseModel):
+    items: List[dict]
+    next_cursor: Optional[str] = None  # Opaque token for the next page, None on the last page
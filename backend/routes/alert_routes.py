@@ -1,9 +1,14 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Response
 from typing import Optional, List
 from datetime import datetime
+from functools import reduce
+from boto3.dynamodb.conditions import Key, Attr
+import orjson
+import asyncio
 
 from models.alert import (
     AlertResponse,
+    AlertBatchRequest,
     AlertConfigUpdate,
     DataStream,
     AlertStatus,
@@ -11,11 +16,42 @@ from models.alert import (
 )
 from models.common import MessageResponse
 from core.dependencies import optional_verify_token
-from core.database import get_table, Tables
+from core.database import get_table, Tables, Indexes, batch_get_items
+from core.cache import cache_get, cache_set, cache_delete, cache_delete_pattern
+from core.config import settings
 from botocore.exceptions import ClientError
 
 router = APIRouter(prefix="/alerts", tags=["Alerting"])
 
+def item_to_alert_response(item: dict) -> AlertResponse:
+    """
+    Convert DynamoDB item to AlertResponse
+    
+    Items come from our own table, so validation is skipped via model_construct.
+    """
+    return AlertResponse.model_construct(
+        alert_id=item['alert_id'],
+        house_id=item['house_id'],
+        device_id=item.get('device_id'),
+        severity=AlertSeverity(item['severity']),
+        message=item['message'],
+        timestamp=datetime.fromisoformat(item['timestamp']),
+        is_read=item.get('is_read', False)
+    )
+
+def alert_cache_key(alert_id: str) -> str:
+    """Cache key for a single alert"""
+    return f"alert:{alert_id}"
+
+def alert_history_cache_key(house_id, device_id, severity, limit) -> str:
+    """Cache key for one alert history query"""
+    severity_value = severity.value if severity else None
+    return f"alerts:{house_id}:{device_id}:{severity_value}:{limit}"
+
+def cached_json_response(content: bytes) -> Response:
+    """Serve pre-serialized JSON straight from the cache"""
+    return Response(content=content, media_type="application/json")
+
 @router.get("/history", response_model=List[AlertResponse])
 async def get_alert_history(
     house_id: Optional[str] = None,
@@ -36,50 +72,81 @@ async def get_alert_history(
     Returns:
         List of alerts
     """
+    cache_key = alert_history_cache_key(house_id, device_id, severity, limit)
+    cached = await cache_get(cache_key)
+    if cached is not None:
+        return cached_json_response(cached)
+    
     table = get_table(Tables.ALERTS)
     
     try:
-        # Build filter expression
-        filter_expressions = []
-        expression_attribute_values = {}
-        
+        # Prefer a GSI query keyed on house or device - results come back newest first
         if house_id:
-            filter_expressions.append("house_id = :house_id")
-            expression_attribute_values[':house_id'] = house_id
+            query_kwargs = {
+                'IndexName': Indexes.ALERTS_BY_HOUSE,
+                'KeyConditionExpression': Key('house_id').eq(house_id),
+            }
+            residual_filters = []
+            if device_id:
+                residual_filters.append(Attr('device_id').eq(device_id))
+            if severity:
+                residual_filters.append(Attr('severity').eq(severity.value))
+        elif device_id:
+            query_kwargs = {
+                'IndexName': Indexes.ALERTS_BY_DEVICE,
+                'KeyConditionExpression': Key('device_id').eq(device_id),
+            }
+            residual_filters = [Attr('severity').eq(severity.value)] if severity else []
+        else:
+            query_kwargs = None
         
-        if device_id:
-            filter_expressions.append("device_id = :device_id")
-            expression_attribute_values[':device_id'] = device_id
-        
-        if severity:
-            filter_expressions.append("severity = :severity")
-            expression_attribute_values[':severity'] = severity.value
-        
-        # Perform scan with optional filters
-        scan_kwargs = {'Limit': limit}
-        
-        if filter_expressions:
-            scan_kwargs['FilterExpression'] = ' AND '.join(filter_expressions)
-            scan_kwargs['ExpressionAttributeValues'] = expression_attribute_values
-        
-        response = table.scan(**scan_kwargs)
-        items = response.get('Items', [])
+        if query_kwargs is not None:
+            query_kwargs['ScanIndexForward'] = False
+            query_kwargs['Limit'] = limit
+            
+            if residual_filters:
+                query_kwargs['FilterExpression'] = reduce(lambda a, b: a & b, residual_filters)
+            
+            # Limit caps items evaluated, not items matched - with residual filters
+            # keep paging (in sort-key order) until we have enough or run out
+            items = []
+            while True:
+                response = await asyncio.to_thread(table.query, **query_kwargs)
+                items.extend(response.get('Items', []))
+                
+                last_key = response.get('LastEvaluatedKey')
+                if len(items) >= limit or not last_key or not residual_filters:
+                    break
+                
+                # Keep full-size pages; shrinking Limit to the shortfall would turn a
+                # selective filter into many round trips evaluating a few items each
+                query_kwargs['ExclusiveStartKey'] = last_key
+            
+            items = items[:limit]
+        else:
+            # No key to query on - fall back to a scan
+            scan_kwargs = {'Limit': limit}
+            
+            if severity:
+                scan_kwargs['FilterExpression'] = Attr('severity').eq(severity.value)
+            
+            response = await asyncio.to_thread(table.scan, **scan_kwargs)
+            items = response.get('Items', [])
         
         # Convert DynamoDB items to AlertResponse models
         alerts = []
         for item in items:
-            alerts.append(AlertResponse(
-                alert_id=item['alert_id'],
-                house_id=item['house_id'],
-                device_id=item.get('device_id'),
-                severity=AlertSeverity(item['severity']),
-                message=item['message'],
-                timestamp=datetime.fromisoformat(item['timestamp']),
-                is_read=item.get('is_read', False)
-            ))
+            alerts.append(item_to_alert_response(item))
+        
+        # Scan results are unordered; queries are already newest first
+        if query_kwargs is None:
+            alerts.sort(key=lambda x: x.timestamp, reverse=True)
         
-        # Sort by timestamp (most recent first)
-        alerts.sort(key=lambda x: x.timestamp, reverse=True)
+        await cache_set(
+            cache_key,
+            orjson.dumps([alert.model_dump() for alert in alerts]),
+            settings.cache_ttl_seconds
+        )
         
         return alerts
     
@@ -94,6 +161,38 @@ async def get_alert_history(
             detail=f"Error processing alerts: {str(e)}"
         )
 
+@router.post("/batch", response_model=List[AlertResponse])
+async def get_alerts_batch(
+    request: AlertBatchRequest,
+    token: Optional[str] = Depends(optional_verify_token)
+):
+    """
+    Get many alerts by ID in one call
+    
+    IDs are fetched with BatchGetItem in 100-key chunks issued in parallel,
+    replacing one get_item round-trip per alert.
+    
+    Args:
+        request: Alert IDs to fetch (up to 1000)
+        
+    Returns:
+        Found alerts in request order (unknown IDs are skipped)
+    """
+    try:
+        found = await asyncio.to_thread(batch_get_items, Tables.ALERTS, 'alert_id', request.alert_ids)
+    except ClientError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to retrieve alerts: {str(e)}"
+        )
+    
+    alerts = []
+    for alert_id in dict.fromkeys(request.alert_ids):
+        if alert_id in found:
+            alerts.append(item_to_alert_response(found[alert_id]))
+    
+    return alerts
+
 @router.put("/{alert_id}/config", response_model=MessageResponse)
 async def update_alert_config(
     alert_id: str,
@@ -165,3 +264,90 @@ async def get_data_stream(
             timestamp=datetime.now()
         )
     ]
+
+@router.get("/{alert_id}", response_model=AlertResponse)
+async def get_alert(
+    alert_id: str,
+    token: Optional[str] = Depends(optional_verify_token)
+):
+    """
+    Get alert by ID
+    
+    Args:
+        alert_id: ID of the alert
+        
+    Returns:
+        Alert information
+    """
+    cache_key = alert_cache_key(alert_id)
+    cached = await cache_get(cache_key)
+    if cached is not None:
+        return cached_json_response(cached)
+    
+    table = get_table(Tables.ALERTS)
+    
+    try:
+        response = await asyncio.to_thread(table.get_item, Key={'alert_id': alert_id})
+        
+        if 'Item' not in response:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Alert not found"
+            )
+        
+        alert = item_to_alert_response(response['Item'])
+        await cache_set(cache_key, orjson.dumps(alert.model_dump()), settings.cache_ttl_seconds)
+        
+        return alert
+    
+    except ClientError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to retrieve alert: {str(e)}"
+        )
+
+@router.patch("/{alert_id}/read", response_model=MessageResponse)
+async def mark_alert_read(
+    alert_id: str,
+    token: Optional[str] = Depends(optional_verify_token)
+):
+    """
+    Mark an alert as read
+    
+    Args:
+        alert_id: ID of the alert
+        
+    Returns:
+        Success message
+    """
+    table = get_table(Tables.ALERTS)
+    
+    try:
+        # Update only if the alert exists - one round-trip instead of get + update
+        await asyncio.to_thread(
+            table.update_item,
+            Key={'alert_id': alert_id},
+            UpdateExpression='SET is_read = :is_read',
+            ConditionExpression='attribute_exists(alert_id)',
+            ExpressionAttributeValues={':is_read': True}
+        )
+    
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Alert not found"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to mark alert as read: {str(e)}"
+        )
+    
+    # Drop the cached detail and every cached history page that may include it
+    await cache_delete(alert_cache_key(alert_id))
+    await cache_delete_pattern("alerts:*")
+    
+    return MessageResponse(
+        message=f"Alert {alert_id} marked as read",
+        success=True
+    )
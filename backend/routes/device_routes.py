@@ -1,7 +1,10 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, HTTPException, status, Depends, Request, Response
+from fastapi.responses import StreamingResponse, ORJSONResponse
 from typing import List, Optional
 from datetime import datetime
+from collections import Counter
+import itertools
+import asyncio
 import uuid
 import io
 import zipfile
@@ -16,14 +19,36 @@ from models.device import (
 )
 from models.common import MessageResponse
 from core.dependencies import optional_verify_token, get_current_user, require_admin
-from core.database import get_table, Tables
+from core.database import get_table, Tables, adjust_house_device_counts, batch_get_items
 from core.aws_iot import iot_manager
 from core.config import settings
+from core.http_cache import compute_etag, not_modified_response
 from botocore.exceptions import ClientError
 
 router = APIRouter(prefix="/devices", tags=["Device Management"])
 logger = logging.getLogger(__name__)
 
+# Most devices accepted by one bulk_add request
+BULK_ADD_MAX_DEVICES = 100
+
+# Static service metadata - built once instead of on every probe
+_HEALTH_RESPONSE = {"status": "healthy", "service": "devices"}
+
+_ROOT_RESPONSE = {
+    "message": "Device Management Service",
+    "version": "1.0.0",
+    "endpoints": [
+        "/devices/add",
+        "/devices/bulk_add",
+        "/devices/",
+        "/devices/house/{house_id}",
+        "/devices/{device_id}",
+        "/devices/{device_id}/status",
+        "/devices/{device_id}/config",
+        "/devices/{device_id}/control",
+    ]
+}
+
 def item_to_device_response(item: dict) -> DeviceResponse:
     """Convert DynamoDB item to DeviceResponse"""
     return DeviceResponse(
@@ -41,7 +66,83 @@ def item_to_device_response(item: dict) -> DeviceResponse:
         updated_at=datetime.fromisoformat(item['updated_at'])
     )
 
-@router.get("/health")
+# Updatable device fields: (model field, expression clause, value placeholder, attribute-name alias)
+_DEVICE_UPDATE_FIELDS = (
+    ('name', '#n = :name', ':name', ('#n', 'name')),
+    ('location', 'location = :location', ':location', None),
+    ('description', 'description = :description', ':description', None),
+    ('status', '#s = :status', ':status', ('#s', 'status')),
+)
+
+def _build_device_update_expressions() -> dict:
+    """
+    Precompute the UpdateExpression for every combination of present fields
+    
+    Returns:
+        Dict keyed by a tuple of presence flags (one per updatable field),
+        mapping to (update_expression, expression_attribute_names)
+    """
+    expressions = {}
+    for present in itertools.product((False, True), repeat=len(_DEVICE_UPDATE_FIELDS)):
+        clauses = []
+        names = {}
+        for is_present, (_, clause, _, alias) in zip(present, _DEVICE_UPDATE_FIELDS):
+            if is_present:
+                clauses.append(clause)
+                if alias:
+                    names[alias[0]] = alias[1]
+        clauses.append("updated_at = :updated_at")
+        expressions[present] = ("SET " + ", ".join(clauses), names)
+    return expressions
+
+_DEVICE_UPDATE_EXPRESSIONS = _build_device_update_expressions()
+
+async def require_houses_exist(house_ids: List[str]) -> None:
+    """
+    Validate that every referenced house exists with a single BatchGetItem
+    
+    Args:
+        house_ids: House IDs referenced by the incoming devices
+        
+    Raises:
+        HTTPException: 404 naming the first missing house, 500 on DynamoDB errors
+    """
+    try:
+        found = await asyncio.to_thread(batch_get_items, Tables.HOUSES, 'house_id', house_ids)
+    except ClientError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to validate house: {str(e)}"
+        )
+    
+    for house_id in house_ids:
+        if house_id not in found:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"House with ID '{house_id}' not found. Please create the house first."
+            )
+
+def build_device_item(device: DeviceAdd, now: str) -> dict:
+    """Build the DynamoDB item for a newly registered device"""
+    return {
+        'device_id': str(uuid.uuid4()),
+        'house_id': device.house_id,
+        'name': device.name,
+        'device_type': device.device_type.value,
+        'location': device.location,
+        'description': device.description,
+        'status': 'offline',
+        'created_at': now,
+        'updated_at': now
+    }
+
+def write_device_items(table, device_items: List[dict]) -> None:
+    """Write device items through a batch writer (blocking - run it in a thread)"""
+    with table.batch_writer() as batch:
+        for device_item in device_items:
+            batch.put_item(Item=device_item)
+
+@router.get("/health", response_class=ORJSONResponse)
 async def health_check():
     """
     Health check endpoint for device service
@@ -49,9 +150,9 @@ async def health_check():
     Returns:
         Health status
     """
-    return {"status": "healthy", "service": "devices"}
+    return _HEALTH_RESPONSE
 
-@router.get("/")
+@router.get("/", response_class=ORJSONResponse)
 async def root():
     """
     Root endpoint for device service
@@ -59,19 +160,7 @@ async def root():
     Returns:
         Service information
     """
-    return {
-        "message": "Device Management Service",
-        "version": "1.0.0",
-        "endpoints": [
-            "/devices/add",
-            "/devices/",
-            "/devices/house/{house_id}",
-            "/devices/{device_id}",
-            "/devices/{device_id}/status",
-            "/devices/{device_id}/config",
-            "/devices/{device_id}/control",
-        ]
-    }
+    return _ROOT_RESPONSE
 
 @router.post("/add", response_model=DeviceResponse, status_code=status.HTTP_201_CREATED)
 async def add_device(
@@ -89,62 +178,76 @@ async def add_device(
         Registered device information
     """
     # Validate that the house exists
-    houses_table = get_table(Tables.HOUSES)
+    await require_houses_exist([device.house_id])
+    
+    # Now create the device
+    table = get_table(Tables.DEVICES)
+    device_item = build_device_item(device, datetime.now().isoformat())
+    
     try:
-        house_response = houses_table.get_item(Key={'house_id': device.house_id})
+        await asyncio.to_thread(table.put_item, Item=device_item)
+        await asyncio.to_thread(adjust_house_device_counts, device.house_id, total_delta=1)
         
-        if 'Item' not in house_response:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"House with ID '{device.house_id}' not found. Please create the house first."
-            )
+        return item_to_device_response(device_item)
+    
     except ClientError as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to validate house: {str(e)}"
+            detail=f"Failed to add device: {str(e)}"
+        )
+
+@router.post("/bulk_add", response_model=List[DeviceResponse], status_code=status.HTTP_201_CREATED)
+async def bulk_add_devices(
+    devices: List[DeviceAdd],
+    current_user: dict = Depends(require_admin)
+):
+    """
+    Register several IoT devices in one request
+    **Admin only** - Caregivers cannot add devices
+    
+    All referenced houses are validated up front with one BatchGetItem, so
+    either every device is written or none are.
+    
+    Args:
+        devices: Devices to register (each must include a valid house_id)
+        
+    Returns:
+        Registered device information, in request order
+    """
+    if not devices:
+        return []
+    
+    if len(devices) > BULK_ADD_MAX_DEVICES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {BULK_ADD_MAX_DEVICES} devices can be added per request"
         )
     
-    # Now create the device
-    table = get_table(Tables.DEVICES)
+    await require_houses_exist([device.house_id for device in devices])
     
-    device_id = str(uuid.uuid4())
+    table = get_table(Tables.DEVICES)
     now = datetime.now().isoformat()
-    
-    device_item = {
-        'device_id': device_id,
-        'house_id': device.house_id,
-        'name': device.name,
-        'device_type': device.device_type.value,
-        'location': device.location,
-        'description': device.description,
-        'status': 'offline',
-        'created_at': now,
-        'updated_at': now
-    }
+    device_items = [build_device_item(device, now) for device in devices]
     
     try:
-        table.put_item(Item=device_item)
-        
-        return DeviceResponse(
-            device_id=device_id,
-            house_id=device.house_id,
-            name=device.name,
-            device_type=device.device_type.value,
-            location=device.location,
-            status='offline',
-            description=device.description,
-            created_at=datetime.fromisoformat(now),
-            updated_at=datetime.fromisoformat(now)
-        )
+        await asyncio.to_thread(write_device_items, table, device_items)
+        
+        added_per_house = Counter(device.house_id for device in devices)
+        for house_id, count in added_per_house.items():
+            await asyncio.to_thread(adjust_house_device_counts, house_id, total_delta=count)
+        
+        return [item_to_device_response(device_item) for device_item in device_items]
     
     except ClientError as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to add device: {str(e)}"
+            detail=f"Failed to add devices: {str(e)}"
         )
 
 @router.get("", response_model=List[DeviceResponse])
 async def list_devices(
+    request: Request,
+    response: Response,
     house_id: Optional[str] = None,
     current_user: dict = Depends(get_current_user)
 ):
@@ -152,6 +255,8 @@ async def list_devices(
     List all devices, optionally filtered by house
     **Read-only for caregivers** - All authenticated users can view devices
     
+    Supports conditional GET: responds 304 when If-None-Match matches the ETag.
+    
     Args:
         house_id: Filter by house ID (optional)
         
@@ -167,14 +272,20 @@ async def list_devices(
             scan_kwargs['FilterExpression'] = 'house_id = :house_id'
             scan_kwargs['ExpressionAttributeValues'] = {':house_id': house_id}
         
-        response = table.scan(**scan_kwargs)
-        items = response.get('Items', [])
+        scan_response = await asyncio.to_thread(table.scan, **scan_kwargs)
+        items = scan_response.get('Items', [])
         
         # Handle pagination
-        while 'LastEvaluatedKey' in response:
-            scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
-            response = table.scan(**scan_kwargs)
-            items.extend(response.get('Items', []))
+        while 'LastEvaluatedKey' in scan_response:
+            scan_kwargs['ExclusiveStartKey'] = scan_response['LastEvaluatedKey']
+            scan_response = await asyncio.to_thread(table.scan, **scan_kwargs)
+            items.extend(scan_response.get('Items', []))
+        
+        etag = compute_etag((item['device_id'], item['updated_at']) for item in items)
+        cached = not_modified_response(request, etag)
+        if cached is not None:
+            return cached
+        response.headers['ETag'] = etag
         
         devices = []
         for item in items:
@@ -191,12 +302,16 @@ async def list_devices(
 @router.get("/house/{house_id}", response_model=List[DeviceResponse])
 async def list_devices_by_house(
     house_id: str,
+    request: Request,
+    response: Response,
     current_user: dict = Depends(get_current_user)
 ):
     """
     List all devices for a specific house
     **Read-only for caregivers** - All authenticated users can view devices
     
+    Supports conditional GET: responds 304 when If-None-Match matches the ETag.
+    
     Args:
         house_id: ID of the house
         
@@ -206,7 +321,7 @@ async def list_devices_by_house(
     # First validate that the house exists
     houses_table = get_table(Tables.HOUSES)
     try:
-        house_response = houses_table.get_item(Key={'house_id': house_id})
+        house_response = await asyncio.to_thread(houses_table.get_item, Key={'house_id': house_id})
         
         if 'Item' not in house_response:
             raise HTTPException(
@@ -228,14 +343,20 @@ async def list_devices_by_house(
             'ExpressionAttributeValues': {':house_id': house_id}
         }
         
-        response = table.scan(**scan_kwargs)
-        items = response.get('Items', [])
+        scan_response = await asyncio.to_thread(table.scan, **scan_kwargs)
+        items = scan_response.get('Items', [])
         
         # Handle pagination
-        while 'LastEvaluatedKey' in response:
-            scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
-            response = table.scan(**scan_kwargs)
-            items.extend(response.get('Items', []))
+        while 'LastEvaluatedKey' in scan_response:
+            scan_kwargs['ExclusiveStartKey'] = scan_response['LastEvaluatedKey']
+            scan_response = await asyncio.to_thread(table.scan, **scan_kwargs)
+            items.extend(scan_response.get('Items', []))
+        
+        etag = compute_etag((item['device_id'], item['updated_at']) for item in items)
+        cached = not_modified_response(request, etag)
+        if cached is not None:
+            return cached
+        response.headers['ETag'] = etag
         
         devices = []
         for item in items:
@@ -267,7 +388,7 @@ async def get_device(
     table = get_table(Tables.DEVICES)
     
     try:
-        response = table.get_item(Key={'device_id': device_id})
+        response = await asyncio.to_thread(table.get_item, Key={'device_id': device_id})
         
         if 'Item' not in response:
             raise HTTPException(
@@ -302,7 +423,7 @@ async def get_device_status(
     table = get_table(Tables.DEVICES)
     
     try:
-        response = table.get_item(Key={'device_id': device_id})
+        response = await asyncio.to_thread(table.get_item, Key={'device_id': device_id})
         
         if 'Item' not in response:
             raise HTTPException(
@@ -346,61 +467,63 @@ async def update_device_config(
     table = get_table(Tables.DEVICES)
     
     try:
-        # Check if device exists
-        response = table.get_item(Key={'device_id': device_id})
-        
-        if 'Item' not in response:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Device not found"
-            )
-        
-        # Build update expression
-        update_expressions = []
-        expression_attribute_values = {}
-        expression_attribute_names = {}
-        
-        if device_update.name is not None:
-            update_expressions.append("#n = :name")
-            expression_attribute_values[':name'] = device_update.name
-            expression_attribute_names['#n'] = 'name'
-        
-        if device_update.location is not None:
-            update_expressions.append("location = :location")
-            expression_attribute_values[':location'] = device_update.location
-        
-        if device_update.description is not None:
-            update_expressions.append("description = :description")
-            expression_attribute_values[':description'] = device_update.description
-        
-        if device_update.status is not None:
-            update_expressions.append("#s = :status")
-            expression_attribute_values[':status'] = device_update.status
-            expression_attribute_names['#s'] = 'status'
-        
-        # Add updated_at
-        update_expressions.append("updated_at = :updated_at")
+        # Pick the prebuilt update expression for the fields present in the request
+        field_values = [getattr(device_update, field) for field, _, _, _ in _DEVICE_UPDATE_FIELDS]
+        present = tuple(value is not None for value in field_values)
+        update_expression, expression_attribute_names = _DEVICE_UPDATE_EXPRESSIONS[present]
+        
+        expression_attribute_values = {
+            placeholder: value
+            for (_, _, placeholder, _), value in zip(_DEVICE_UPDATE_FIELDS, field_values)
+            if value is not None
+        }
         expression_attribute_values[':updated_at'] = datetime.now().isoformat()
         
-        update_expression = "SET " + ", ".join(update_expressions)
-        
-        # Perform update
+        # Perform update; ALL_OLD returns the item exactly as this write found it, so the
+        # previous status is unambiguous (UPDATED_OLD may omit attributes SET to the same value)
         update_kwargs = {
             'Key': {'device_id': device_id},
             'UpdateExpression': update_expression,
             'ExpressionAttributeValues': expression_attribute_values,
-            'ReturnValues': 'ALL_NEW'
+            # 404 instead of creating a stub item for an unknown device
+            'ConditionExpression': 'attribute_exists(device_id)',
+            'ReturnValues': 'ALL_OLD'
         }
         
         if expression_attribute_names:
             update_kwargs['ExpressionAttributeNames'] = expression_attribute_names
         
-        response = table.update_item(**update_kwargs)
+        response = await asyncio.to_thread(table.update_item, **update_kwargs)
+        previous = response['Attributes']
         
-        item = response['Attributes']
+        # Keep the house's active device counter in step with real online/offline transitions
+        if device_update.status is not None:
+            was_online = previous.get('status') == 'online'
+            is_online = device_update.status == 'online'
+            if was_online != is_online:
+                await asyncio.to_thread(
+                    adjust_house_device_counts,
+                    previous['house_id'],
+                    active_delta=1 if is_online else -1
+                )
+        
+        item = {
+            **previous,
+            **{
+                field: value
+                for (field, _, _, _), value in zip(_DEVICE_UPDATE_FIELDS, field_values)
+                if value is not None
+            },
+            'updated_at': expression_attribute_values[':updated_at']
+        }
         return item_to_device_response(item)
     
     except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Device not found"
+            )
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to update device: {str(e)}"
@@ -448,7 +571,7 @@ async def provision_device_certificates(
     
     try:
         # Check if device exists
-        response = table.get_item(Key={'device_id': device_id})
+        response = await asyncio.to_thread(table.get_item, Key={'device_id': device_id})
         
         if 'Item' not in response:
             raise HTTPException(
@@ -460,10 +583,11 @@ async def provision_device_certificates(
         thing_name = f"device_{device_id}"
         
         # Create device in AWS IoT with certificates
-        iot_response = iot_manager.create_device_with_certificates(thing_name)
+        iot_response = await asyncio.to_thread(iot_manager.create_device_with_certificates, thing_name)
         
         # Store certificate data and ARN in database
-        table.update_item(
+        await asyncio.to_thread(
+            table.update_item,
             Key={'device_id': device_id},
             UpdateExpression='SET certificate_arn = :cert_arn, thing_name = :thing_name, certificates = :certs, updated_at = :updated_at',
             ExpressionAttributeValues={
@@ -513,7 +637,7 @@ async def download_device_certificates(
     
     try:
         # Check if device exists and has been provisioned
-        response = table.get_item(Key={'device_id': device_id})
+        response = await asyncio.to_thread(table.get_item, Key={'device_id': device_id})
         
         if 'Item' not in response:
             raise HTTPException(
@@ -670,7 +794,7 @@ async def delete_device(
     
     try:
         # Check if device exists
-        response = table.get_item(Key={'device_id': device_id})
+        response = await asyncio.to_thread(table.get_item, Key={'device_id': device_id})
         
         if 'Item' not in response:
             raise HTTPException(
@@ -687,7 +811,8 @@ async def delete_device(
         if device.get('thing_name') and device.get('certificate_arn'):
             try:
                 logger.info(f"Deleting from AWS IoT: {device['thing_name']}")
-                iot_manager.delete_device(
+                await asyncio.to_thread(
+                    iot_manager.delete_device,
                     device['thing_name'],
                     device['certificate_arn']
                 )
@@ -699,9 +824,24 @@ async def delete_device(
             logger.info(f"Device not provisioned, skipping AWS IoT cleanup")
         
         # Delete the device from database
-        table.delete_item(Key={'device_id': device_id})
+        delete_response = await asyncio.to_thread(
+            table.delete_item,
+            Key={'device_id': device_id},
+            ReturnValues='ALL_OLD'
+        )
         logger.info(f"Device deleted from database: {device_id}")
         
+        # Counters follow the item this delete actually removed - none if a
+        # concurrent delete got there first
+        deleted = delete_response.get('Attributes')
+        if deleted:
+            await asyncio.to_thread(
+                adjust_house_device_counts,
+                deleted['house_id'],
+                total_delta=-1,
+                active_delta=-1 if deleted.get('status') == 'online' else 0
+            )
+        
         return MessageResponse(
             message=f"Device '{device_name}' deleted successfully. All certificates and AWS IoT resources have been removed.",
             success=True
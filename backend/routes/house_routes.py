@@ -1,5 +1,6 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Request, Response
 from datetime import datetime
+import asyncio
 from typing import Optional, List
 
 from models.house import (
@@ -10,59 +11,76 @@ from models.house import (
 )
 from models.common import MessageResponse
 from core.dependencies import optional_verify_token
-from core.database import get_table, Tables
+from core.database import get_table, Tables, count_devices_by_house
+from core.http_cache import compute_etag, not_modified_response
 from botocore.exceptions import ClientError
 
 router = APIRouter(prefix="/houses", tags=["Registration"])
 
 @router.get("", response_model=List[HouseResponse])
-async def list_houses(token: Optional[str] = Depends(optional_verify_token)):
+async def list_houses(
+    request: Request,
+    response: Response,
+    token: Optional[str] = Depends(optional_verify_token)
+):
     """
     Get all houses from the system with device counts
     
+    Device counts are denormalized onto each house item and maintained by
+    the device routes, so no scan of the devices table is needed - except
+    for houses whose counters haven't been backfilled yet
+    (see backfill_device_counts.py), which are counted directly.
+    Supports conditional GET: responds 304 when If-None-Match matches the ETag.
+    
     Returns:
         List of all houses with device statistics
     """
     houses_table = get_table(Tables.HOUSES)
-    devices_table = get_table(Tables.DEVICES)
     
     try:
         # Get all houses
-        response = houses_table.scan()
-        items = response.get('Items', [])
+        scan_response = await asyncio.to_thread(houses_table.scan)
+        items = scan_response.get('Items', [])
         
         # Handle pagination
-        while 'LastEvaluatedKey' in response:
-            response = houses_table.scan(ExclusiveStartKey=response['LastEvaluatedKey'])
-            items.extend(response.get('Items', []))
+        while 'LastEvaluatedKey' in scan_response:
+            scan_response = await asyncio.to_thread(
+                houses_table.scan,
+                ExclusiveStartKey=scan_response['LastEvaluatedKey']
+            )
+            items.extend(scan_response.get('Items', []))
         
-        # Get all devices
-        devices_response = devices_table.scan()
-        all_devices = devices_response.get('Items', [])
+        # Houses predating the counters would otherwise show 0 devices
+        uncounted = [
+            item for item in items
+            if 'total_devices' not in item or 'active_devices' not in item
+        ]
+        if uncounted:
+            device_counts = await asyncio.to_thread(count_devices_by_house)
+            for item in uncounted:
+                item['total_devices'], item['active_devices'] = device_counts.get(item['house_id'], (0, 0))
         
-        # Handle pagination for devices
-        while 'LastEvaluatedKey' in devices_response:
-            devices_response = devices_table.scan(ExclusiveStartKey=devices_response['LastEvaluatedKey'])
-            all_devices.extend(devices_response.get('Items', []))
+        # Counters change via ADD without touching updated_at, so they are part of the version
+        etag = compute_etag(
+            (item['house_id'], item['updated_at'], item.get('total_devices', 0), item.get('active_devices', 0))
+            for item in items
+        )
+        cached = not_modified_response(request, etag)
+        if cached is not None:
+            return cached
+        response.headers['ETag'] = etag
         
         houses = []
         for item in items:
-            house_id = item['house_id']
-            
-            # Count devices for this house
-            house_devices = [d for d in all_devices if d.get('house_id') == house_id]
-            total_devices = len(house_devices)
-            active_devices = len([d for d in house_devices if d.get('status') == 'online'])
-            
             houses.append(HouseResponse(
-                house_id=house_id,
+                house_id=item['house_id'],
                 name=item['name'],
                 address=item['address'],
                 owner_id=item.get('owner_id', item.get('owner_name', '')),
                 description=item.get('description', ''),
                 status=item.get('status', 'active'),
-                total_devices=total_devices,
-                active_devices=active_devices,
+                total_devices=int(item.get('total_devices', 0)),
+                active_devices=int(item.get('active_devices', 0)),
                 created_at=datetime.fromisoformat(item['created_at']),
                 updated_at=datetime.fromisoformat(item['updated_at'])
             ))
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query
 from datetime import datetime, timedelta
-from typing import List
-from jose import jwt
+from typing import Optional
+import jwt
 import bcrypt
+import asyncio
 
 from models.user import (
     UserCreate,
@@ -11,31 +12,50 @@ from models.user import (
     UserAuth,
     AuthResponse
 )
-from models.common import MessageResponse
-from core.dependencies import verify_token
-from core.database import get_table, Tables
+from models.common import MessageResponse, PageResponse
+from core.dependencies import verify_token, SECRET_KEY_BYTES
+from core.database import get_table, Tables, Indexes, encode_cursor, decode_cursor
 from core.config import settings
 from botocore.exceptions import ClientError
+from boto3.dynamodb.conditions import Key
 import uuid
 
 # User management router
 router = APIRouter(prefix="/users", tags=["User Management"])
 
-@router.get("", response_model=List[dict])
-async def get_all_users():
-    """Get all users from DynamoDB"""
+@router.get("", response_model=PageResponse)
+async def get_all_users(limit: int = Query(100, ge=1, le=1000), cursor: Optional[str] = None):
+    """
+    Get one page of users from DynamoDB
+    
+    Args:
+        limit: Maximum number of users to return in this page (1-1000)
+        cursor: next_cursor from the previous page (omit for the first page)
+        
+    Returns:
+        Page of users plus the cursor for the next page
+    """
     table = get_table(Tables.USERS)
     
+    scan_kwargs = {'Limit': limit}
+    if cursor:
+        try:
+            scan_kwargs['ExclusiveStartKey'] = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+    
     try:
-        response = table.scan()
-        items = response.get('Items', [])
-        
-        while 'LastEvaluatedKey' in response:
-            response = table.scan(ExclusiveStartKey=response['LastEvaluatedKey'])
-            items.extend(response.get('Items', []))
+        # boto3 is blocking - keep the event loop free while DynamoDB responds
+        response = await asyncio.to_thread(table.scan, **scan_kwargs)
         
         # Return items as-is (whatever fields are in DynamoDB)
-        return items
+        return PageResponse(
+            items=response.get('Items', []),
+            next_cursor=encode_cursor(response.get('LastEvaluatedKey'))
+        )
     
     except ClientError as e:
         raise HTTPException(
@@ -49,7 +69,7 @@ async def get_user_by_id(user_id: str):
     table = get_table(Tables.USERS)
     
     try:
-        response = table.get_item(Key={'user_id': user_id})
+        response = await asyncio.to_thread(table.get_item, Key={'user_id': user_id})
         
         if 'Item' not in response:
             raise HTTPException(
@@ -92,10 +112,12 @@ async def user_authentication(credentials: UserAuth):
     table = get_table(Tables.USERS)
     
     try:
-        # Scan for user by email (username is email)
-        response = table.scan(
-            FilterExpression='email = :email',
-            ExpressionAttributeValues={':email': credentials.username}
+        # Look up user by email (username is email) via the email GSI
+        response = await asyncio.to_thread(
+            table.query,
+            IndexName=Indexes.USERS_BY_EMAIL,
+            KeyConditionExpression=Key('email').eq(credentials.username),
+            Limit=1
         )
         
         items = response.get('Items', [])
@@ -113,7 +135,8 @@ async def user_authentication(credentials: UserAuth):
         password_bytes = credentials.password.encode('utf-8')
         stored_hash = user['password_hash'].encode('utf-8')
         
-        if not bcrypt.checkpw(password_bytes, stored_hash):
+        # bcrypt is deliberately slow - verify in a worker thread so other requests keep flowing
+        if not await asyncio.to_thread(bcrypt.checkpw, password_bytes, stored_hash):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid credentials",
@@ -138,7 +161,7 @@ async def user_authentication(credentials: UserAuth):
         
         access_token = jwt.encode(
             token_data,
-            settings.secret_key,
+            SECRET_KEY_BYTES,
             algorithm=settings.algorithm
         )
         
@@ -163,12 +186,30 @@ async def create_user(user: UserCreate):
     
     user_id = str(uuid.uuid4())
     
-    # Hash password using bcrypt
+    # Reject duplicate emails - login resolves users by email
+    try:
+        existing = await asyncio.to_thread(
+            table.query,
+            IndexName=Indexes.USERS_BY_EMAIL,
+            KeyConditionExpression=Key('email').eq(user.email),
+            Limit=1
+        )
+    except ClientError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to create user: {str(e)}"
+        )
+    
+    if existing.get('Items'):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A user with this email already exists"
+        )
+    
+    # Hash password using bcrypt (in a worker thread - hashing takes ~100ms of CPU)
     password_bytes = user.password.encode('utf-8')
     salt = bcrypt.gensalt()
-    hashed_password = bcrypt.hashpw(password_bytes, salt).decode('utf-8')
-    
-    # Skip email check for now (no index in DynamoDB)
+    hashed_password = (await asyncio.to_thread(bcrypt.hashpw, password_bytes, salt)).decode('utf-8')
     
     now = datetime.now().isoformat()
     user_item = {
@@ -183,7 +224,7 @@ async def create_user(user: UserCreate):
     }
     
     try:
-        table.put_item(Item=user_item)
+        await asyncio.to_thread(table.put_item, Item=user_item)
     except ClientError as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -219,17 +260,12 @@ async def delete_user(user_id: str):
     table = get_table(Tables.USERS)
     
     try:
-        # Check if user exists first
-        response = table.get_item(Key={'user_id': user_id})
-        
-        if 'Item' not in response:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
-            )
-        
-        # Delete the user
-        table.delete_item(Key={'user_id': user_id})
+        # Delete only if the user exists - one round-trip instead of get + delete
+        await asyncio.to_thread(
+            table.delete_item,
+            Key={'user_id': user_id},
+            ConditionExpression='attribute_exists(user_id)'
+        )
         
         return MessageResponse(
             message=f"User {user_id} deleted successfully",
@@ -237,6 +273,11 @@ async def delete_user(user_id: str):
         )
     
     except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to delete user: {str(e)}"
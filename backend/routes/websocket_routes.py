@@ -2,8 +2,9 @@
 WebSocket Routes for Real-time Device Communication
 """
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
-from core.websocket_manager import manager
-import json
+from core.websocket_manager import manager, send_message, encode_message, SEND_TIMEOUT_SECONDS
+import asyncio
+import orjson
 import logging
 from datetime import datetime
 
@@ -11,6 +12,147 @@ router = APIRouter(tags=["WebSocket"])
 
 logger = logging.getLogger(__name__)
 
+# Largest client frame we will parse; bigger frames close the connection (1009)
+MAX_FRAME_BYTES = 64 * 1024
+
+# How long to wait for a client frame before probing the connection
+IDLE_TIMEOUT_SECONDS = 60
+
+# Pre-serialized replies for fixed messages; only the timestamp is patched in
+PONG_TEMPLATE = encode_message({"type": "pong", "timestamp": "%s"})
+MISSING_ACTION_TEMPLATE = encode_message({
+    "type": "error",
+    "message": "Missing 'action' field in message",
+    "timestamp": "%s"
+})
+MISSING_SUBSCRIBE_DEVICE_TEMPLATE = encode_message({
+    "type": "error",
+    "message": "Missing 'device_id' for subscribe action",
+    "timestamp": "%s"
+})
+MISSING_UNSUBSCRIBE_DEVICE_TEMPLATE = encode_message({
+    "type": "error",
+    "message": "Missing 'device_id' for unsubscribe action",
+    "timestamp": "%s"
+})
+RATE_LIMITED_TEMPLATE = encode_message({
+    "type": "error",
+    "message": "Rate limit exceeded, message dropped",
+    "timestamp": "%s"
+})
+KEEPALIVE_TEMPLATE = encode_message({"type": "ping", "timestamp": "%s"})
+
+
+async def receive_frame(websocket: WebSocket):
+    """
+    Receive one client frame without decoding it
+    
+    Binary frames are passed through as bytes and text frames as str;
+    orjson parses either directly, so no bytes->str copy is made.
+    
+    Args:
+        websocket: Connection to read from
+        
+    Returns:
+        Raw frame payload (bytes or str)
+        
+    Raises:
+        WebSocketDisconnect: If the client closed the connection
+    """
+    frame = await websocket.receive()
+    
+    if frame["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(frame.get("code", status.WS_1000_NORMAL_CLOSURE))
+    
+    if frame.get("bytes") is not None:
+        return frame["bytes"]
+    return frame.get("text") or ""
+
+
+async def handle_subscribe(websocket: WebSocket, message: dict, now_iso: str):
+    """Subscribe the client to a device's updates"""
+    device_id = message.get("device_id")
+    
+    if not device_id:
+        await websocket.send_text(MISSING_SUBSCRIBE_DEVICE_TEMPLATE % now_iso)
+        return
+    
+    await manager.subscribe(websocket, device_id)
+    logger.info(f"Client subscribed to device: {device_id}")
+
+
+async def handle_unsubscribe(websocket: WebSocket, message: dict, now_iso: str):
+    """Unsubscribe the client from a device's updates"""
+    device_id = message.get("device_id")
+    
+    if not device_id:
+        await websocket.send_text(MISSING_UNSUBSCRIBE_DEVICE_TEMPLATE % now_iso)
+        return
+    
+    await manager.unsubscribe(websocket, device_id)
+    logger.info(f"Client unsubscribed from device: {device_id}")
+
+
+async def handle_ping(websocket: WebSocket, message: dict, now_iso: str):
+    """Answer a keepalive ping"""
+    await websocket.send_text(PONG_TEMPLATE % now_iso)
+
+
+async def handle_stats(websocket: WebSocket, message: dict, now_iso: str):
+    """Record client performance metrics, or report server stats when none are sent"""
+    # Client sending performance metrics
+    device_id = message.get("device_id")
+    metrics = message.get("metrics")
+    
+    if device_id and metrics:
+        # Log client performance metrics
+        logger.info(
+            f"Client metrics for device {device_id}: "
+            f"FPS={metrics.get('currentFps', 0):.1f}, "
+            f"Latency={metrics.get('averageLatency', 0)}ms, "
+            f"Frames={metrics.get('totalFrames', 0)}, "
+            f"Dropped={metrics.get('droppedFrames', 0)}"
+        )
+        
+        # Could store metrics in database for analytics
+        # await store_client_metrics(device_id, metrics)
+        
+        # Acknowledge receipt
+        await send_message(websocket, {
+            "type": "stats_ack",
+            "device_id": device_id,
+            "message": "Metrics received",
+            "timestamp": now_iso
+        })
+    else:
+        # Client requesting server stats
+        stats = manager.get_stats()
+        await send_message(websocket, {
+            "type": "stats",
+            "data": stats,
+            "timestamp": now_iso
+        })
+        logger.info(f"Stats requested: {stats}")
+
+
+# Client action -> handler(websocket, message, now_iso)
+HANDLERS = {
+    "subscribe": handle_subscribe,
+    "unsubscribe": handle_unsubscribe,
+    "ping": handle_ping,
+    "stats": handle_stats,
+}
+
+SUPPORTED_ACTIONS = list(HANDLERS)
+
+# Unknown-action error with the supported list serialized once; the message
+# slot takes an already JSON-encoded string since it echoes client input
+UNKNOWN_ACTION_TEMPLATE = (
+    '{"type":"error","message":%s,"supported_actions":'
+    + encode_message(SUPPORTED_ACTIONS)
+    + ',"timestamp":"%s"}'
+)
+
 
 @router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
@@ -27,7 +169,7 @@ async def websocket_endpoint(websocket: WebSocket):
     
     try:
         # Send welcome message
-        await websocket.send_json({
+        await send_message(websocket, {
             "type": "connected",
             "message": "WebSocket connection established",
             "timestamp": datetime.now().isoformat(),
@@ -38,119 +180,72 @@ async def websocket_endpoint(websocket: WebSocket):
         while True:
             try:
                 # Receive message from client
-                data = await websocket.receive_text()
+                try:
+                    data = await asyncio.wait_for(receive_frame(websocket), timeout=IDLE_TIMEOUT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Viewers may only listen, so probe instead of dropping them;
+                    # a socket that can't take the probe is dead and gets reaped
+                    try:
+                        await asyncio.wait_for(
+                            websocket.send_text(KEEPALIVE_TEMPLATE % datetime.now().isoformat()),
+                            timeout=SEND_TIMEOUT_SECONDS
+                        )
+                    except Exception:
+                        logger.info("Closing idle WebSocket that did not accept keepalive")
+                        break
+                    continue
+                
+                # One timestamp per incoming message, shared by every reply
+                now_iso = datetime.now().isoformat()
+                
+                # Reject oversized frames before parsing them
+                if len(data) > MAX_FRAME_BYTES:
+                    logger.warning(f"Closing WebSocket: frame of {len(data)} bytes exceeds {MAX_FRAME_BYTES}")
+                    await websocket.close(code=status.WS_1009_MESSAGE_TOO_BIG)
+                    break
+                
+                # Drop messages over the per-connection rate limit
+                if not manager.allow_message(websocket):
+                    await websocket.send_text(RATE_LIMITED_TEMPLATE % now_iso)
+                    continue
                 
                 try:
                     # Parse JSON message
-                    message = json.loads(data)
+                    message = orjson.loads(data)
                     action = message.get("action")
                     
                     if not action:
-                        await websocket.send_json({
-                            "type": "error",
-                            "message": "Missing 'action' field in message",
-                            "timestamp": datetime.now().isoformat()
-                        })
+                        await websocket.send_text(MISSING_ACTION_TEMPLATE % now_iso)
                         continue
                     
-                    # Handle subscribe action
-                    if action == "subscribe":
-                        device_id = message.get("device_id")
-                        
-                        if not device_id:
-                            await websocket.send_json({
-                                "type": "error",
-                                "message": "Missing 'device_id' for subscribe action",
-                                "timestamp": datetime.now().isoformat()
-                            })
-                            continue
-                        
-                        await manager.subscribe(websocket, device_id)
-                        logger.info(f"Client subscribed to device: {device_id}")
-                    
-                    # Handle unsubscribe action
-                    elif action == "unsubscribe":
-                        device_id = message.get("device_id")
-                        
-                        if not device_id:
-                            await websocket.send_json({
-                                "type": "error",
-                                "message": "Missing 'device_id' for unsubscribe action",
-                                "timestamp": datetime.now().isoformat()
-                            })
-                            continue
-                        
-                        await manager.unsubscribe(websocket, device_id)
-                        logger.info(f"Client unsubscribed from device: {device_id}")
-                    
-                    # Handle ping action (keepalive)
-                    elif action == "ping":
-                        await websocket.send_json({
-                            "type": "pong",
-                            "timestamp": datetime.now().isoformat()
-                        })
-                    
-                    # Handle stats request
-                    elif action == "stats":
-                        # Client sending performance metrics
-                        device_id = message.get("device_id")
-                        metrics = message.get("metrics")
-                        
-                        if device_id and metrics:
-                            # Log client performance metrics
-                            logger.info(
-                                f"Client metrics for device {device_id}: "
-                                f"FPS={metrics.get('currentFps', 0):.1f}, "
-                                f"Latency={metrics.get('averageLatency', 0)}ms, "
-                                f"Frames={metrics.get('totalFrames', 0)}, "
-                                f"Dropped={metrics.get('droppedFrames', 0)}"
-                            )
-                            
-                            # Could store metrics in database for analytics
-                            # await store_client_metrics(device_id, metrics)
-                            
-                            # Acknowledge receipt
-                            await websocket.send_json({
-                                "type": "stats_ack",
-                                "device_id": device_id,
-                                "message": "Metrics received",
-                                "timestamp": datetime.now().isoformat()
-                            })
-                        else:
-                            # Client requesting server stats
-                            stats = manager.get_stats()
-                            await websocket.send_json({
-                                "type": "stats",
-                                "data": stats,
-                                "timestamp": datetime.now().isoformat()
-                            })
-                            logger.info(f"Stats requested: {stats}")
+                    handler = HANDLERS.get(action)
                     
                     # Unknown action
-                    else:
-                        await websocket.send_json({
-                            "type": "error",
-                            "message": f"Unknown action: {action}",
-                            "supported_actions": ["subscribe", "unsubscribe", "ping", "stats"],
-                            "timestamp": datetime.now().isoformat()
-                        })
+                    if handler is None:
+                        await websocket.send_text(UNKNOWN_ACTION_TEMPLATE % (
+                            encode_message(f"Unknown action: {action}"),
+                            now_iso
+                        ))
                         logger.warning(f"Unknown action received: {action}")
+                        continue
+                    
+                    await handler(websocket, message, now_iso)
                 
-                except json.JSONDecodeError as e:
+                except orjson.JSONDecodeError as e:
                     # Invalid JSON
-                    await websocket.send_json({
+                    await send_message(websocket, {
                         "type": "error",
                         "message": f"Invalid JSON format: {str(e)}",
-                        "timestamp": datetime.now().isoformat()
+                        "timestamp": now_iso
                     })
                     logger.error(f"JSON decode error: {e}")
                 
                 except Exception as e:
                     # Other errors
-                    await websocket.send_json({
+                    await send_message(websocket, {
                         "type": "error",
                         "message": f"Error processing message: {str(e)}",
-                        "timestamp": datetime.now().isoformat()
+                        "timestamp": now_iso
                     })
                     logger.error(f"Error processing message: {e}")
             
@@ -203,9 +298,11 @@ async def broadcast_to_device(device_id: str, message: dict):
         device_id: Device ID to broadcast to
         message: Message payload to send
     """
+    now_iso = datetime.now().isoformat()
+    
     await manager.broadcast_to_device(device_id, {
         "device_id": device_id,
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": now_iso,
         **message
     })
     
@@ -213,7 +310,7 @@ async def broadcast_to_device(device_id: str, message: dict):
         "status": "broadcasted",
         "device_id": device_id,
         "subscriber_count": manager.get_device_subscriber_count(device_id),
-        "timestamp": datetime.now().isoformat()
+        "timestamp": now_iso
     }
 
 
@@ -226,13 +323,15 @@ async def broadcast_to_all(message: dict):
     Args:
         message: Message payload to send
     """
+    now_iso = datetime.now().isoformat()
+    
     await manager.broadcast_all({
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": now_iso,
         **message
     })
     
     return {
         "status": "broadcasted",
         "connection_count": len(manager.active_connections),
-        "timestamp": datetime.now().isoformat()
+        "timestamp": now_iso
     }
@@ -1,25 +1,30 @@
 """
-Quick test to check if passlib is working correctly
+Quick check that bcrypt hashing works correctly
+
+Run manually with `python test_password.py`; nothing executes on import.
 """
-from passlib.context import CryptContext
+import bcrypt
+
+
+def main():
+    # Test password
+    password = "admin123"
+    print(f"Testing password: {password}")
 
-# Create password context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    # Hash the password
+    hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+    print(f"Hashed: {hashed.decode('utf-8')}")
 
-# Test password
-password = "admin123"
-print(f"Testing password: {password}")
+    # Verify the password
+    result = bcrypt.checkpw(password.encode('utf-8'), hashed)
+    print(f"Verification result: {result}")
 
-# Hash the password
-hashed = pwd_context.hash(password)
-print(f"Hashed: {hashed}")
+    # Test with existing hash
+    existing_hash = "$2b$12$LQv3c1yqBWVHxkd0LHAkCOYz6TtxMQJqhN8/LewY5GyYIyHRKpqeu"
+    print(f"\nTesting with existing hash...")
+    result2 = bcrypt.checkpw(password.encode('utf-8'), existing_hash.encode('utf-8'))
+    print(f"Verification with existing hash: {result2}")
 
-# Verify the password
-result = pwd_context.verify(password, hashed)
-print(f"Verification result: {result}")
 
-# Test with existing hash
-existing_hash = "$2b$12$LQv3c1yqBWVHxkd0LHAkCOYz6TtxMQJqhN8/LewY5GyYIyHRKpqeu"
-print(f"\nTesting with existing hash...")
-result2 = pwd_context.verify(password, existing_hash)
-print(f"Verification with existing hash: {result2}")
+if __name__ == "__main__":
+    main()
@@ -187,8 +187,12 @@ class ApiService {
   }
 
   // Users
-  async getUsers() {
-    return this.fetch('/users');
+  async getUsers(limit = 100, cursor = null) {
+    const params = new URLSearchParams({ limit });
+    if (cursor) params.append('cursor', cursor);
+
+    // Returns { items, next_cursor }; pass next_cursor back to fetch the next page
+    return this.fetch(`/users?${params.toString()}`);
   }
 
   async getUser(userId) {
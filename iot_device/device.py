@@ -6,23 +6,71 @@ Each device can have its own certificates and publish to separate topics
 """
 
 import cv2
+import numpy as np
 import pyaudio
+import os
 import sys
 import time
-import json
-import base64
+import orjson
+import struct
 import threading
+import queue
 import signal
 import atexit
-from datetime import datetime
+import functools
+import logging
+import logging.handlers
+import math
+import collections
 from pathlib import Path
 from awscrt import mqtt
 from awsiot import mqtt_connection_builder
 
+# libjpeg-turbo is optional; fall back to cv2.imencode without it
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR, TJSAMP_420
+except ImportError:
+    TurboJPEG = None
+
+# Numba is optional; fall back to numpy ufuncs for audio amplification without it
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# Device threads log through a queue; a listener thread does the console I/O
+logger = logging.getLogger("iot_device")
+
+
+def setup_logging():
+    """
+    Attach a QueueHandler to the device logger and start its QueueListener
+    
+    Level comes from the LOG_LEVEL environment variable (default INFO).
+    """
+    log_queue = queue.SimpleQueue()
+    
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter("%(message)s"))
+    
+    listener = logging.handlers.QueueListener(log_queue, console)
+    
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
+    logger.propagate = False
+    
+    listener.start()
+    atexit.register(listener.stop)
+    
+    return listener
+
 # Global device instances for cleanup
 camera_device = None
 microphone_device = None
 
+# Set by a shutdown signal or once every device has stopped; main() waits on it
+shutdown_event = threading.Event()
+
 def cleanup_all():
     """Cleanup all devices on exit"""
     global camera_device, microphone_device
@@ -32,9 +80,17 @@ def cleanup_all():
         microphone_device.cleanup()
 
 def signal_handler(sig, frame):
-    """Handle Ctrl+C and termination signals"""
-    cleanup_all()
-    sys.exit(0)
+    """Handle Ctrl+C and termination signals - wake main() to stop the devices"""
+    shutdown_event.set()
+
+def run_device(device):
+    """Device thread target - runs the device, then wakes main() if it was the last one running"""
+    try:
+        device.run()
+    finally:
+        device.stopped.set()
+        if all(d.stopped.is_set() for d in (camera_device, microphone_device) if d is not None):
+            shutdown_event.set()
 
 # Register cleanup handlers
 atexit.register(cleanup_all)
@@ -42,33 +98,43 @@ signal.signal(signal.SIGINT, signal_handler)
 signal.signal(signal.SIGTERM, signal_handler)
 
 # Configuration directories
-CAMERA_CONFIG = Path("certs/camera/config.json")
-MICROPHONE_CONFIG = Path("certs/microphone/config.json")
+CAMERA_CERTS_DIR = Path("certs/camera")
+MICROPHONE_CERTS_DIR = Path("certs/microphone")
+CAMERA_CONFIG = CAMERA_CERTS_DIR / "config.json"
+MICROPHONE_CONFIG = MICROPHONE_CERTS_DIR / "config.json"
 
+@functools.lru_cache(maxsize=4)
 def load_config(config_path):
-    """Load device configuration from config.json"""
-    if not config_path.exists():
-        return None
-    
+    """Load device configuration from config.json (parsed once per path)"""
     try:
-        with open(config_path) as f:
-            return json.load(f)
-    except Exception as e:
+        return orjson.loads(config_path.read_bytes())
+    except (OSError, orjson.JSONDecodeError):
         return None
 
 def check_available_devices():
-    """Check which devices have valid configurations"""
-    devices = {}
+    """
+    Check which devices have valid configurations
     
-    # Check camera
-    camera_config = load_config(CAMERA_CONFIG)
-    if camera_config:
-        devices['camera'] = camera_config
+    Certificate paths are resolved and checked here, once, and stored on each
+    device's config as 'cert_paths' for every later connection attempt.
+    """
+    devices = {}
     
-    # Check microphone
-    mic_config = load_config(MICROPHONE_CONFIG)
-    if mic_config:
-        devices['microphone'] = mic_config
+    for name, config_path, certs_dir in (
+        ('camera', CAMERA_CONFIG, CAMERA_CERTS_DIR),
+        ('microphone', MICROPHONE_CONFIG, MICROPHONE_CERTS_DIR)
+    ):
+        config = load_config(config_path)
+        if not config:
+            continue
+        
+        cert_paths = resolve_cert_paths(config, certs_dir)
+        if cert_paths is None:
+            print(f"\n⚠️  {name.capitalize()} certificate files missing in '{certs_dir}/' - skipping")
+            continue
+        
+        # Copy so the cached parsed config stays untouched
+        devices[name] = {**config, 'cert_paths': cert_paths}
     
     if not devices:
         print("\n❌ No device configurations found!")
@@ -84,26 +150,385 @@ def check_available_devices():
     return devices
 
 # Configuration
-FRAME_WIDTH = 640
-FRAME_HEIGHT = 480
+# 320x240 is plenty for 1 FPS presence monitoring; override with FRAME_WIDTH/FRAME_HEIGHT
+FRAME_WIDTH = int(os.environ.get("FRAME_WIDTH", 320))
+FRAME_HEIGHT = int(os.environ.get("FRAME_HEIGHT", 240))
 CAPTURE_INTERVAL = 1  # seconds - 1 FPS for smooth updates without overwhelming system
 
+GRAB_RETRY_DELAY = 0.1  # seconds - back-off after a failed grab so a dead camera doesn't spin
+
+# JPEG quality adapts to keep frames under the 128 KB MQTT payload limit
+JPEG_QUALITY = 70
+JPEG_MIN_QUALITY = 40
+JPEG_QUALITY_STEP = 5
+JPEG_TARGET_BYTES = 120 * 1024
+JPEG_SIZE_EWMA_ALPHA = 0.2
+
+# Latency-sensitive threads are pinned to separate CPUs; the camera's grab and
+# encode threads also ask for SCHED_FIFO (both block or finish quickly each frame)
+CAMERA_CPU = 1  # grab thread
+MICROPHONE_CPU = 2
+CAMERA_ENCODER_CPU = 3
+CAMERA_RT_PRIORITY = 10
+
+# Media is published at QoS 0; devices listed in RELIABLE_PUBLISH (e.g. "camera,microphone")
+# use QoS 1 instead, trading a PUBACK round trip per message for delivery guarantees
+RELIABLE_PUBLISH = {name.strip() for name in os.environ.get("RELIABLE_PUBLISH", "").split(",") if name.strip()}
+
+# Camera pipeline: capture -> encode thread -> publish thread
+# Microphone pipeline: capture -> publish thread
+PIPELINE_QUEUE_SIZE = 2
+PIPELINE_POLL_TIMEOUT = 0.5  # seconds - how often idle workers re-check `running`
+
+# Pipeline counters are logged from each capture loop at this interval
+STATS_INTERVAL = 10  # seconds
+PUBLISH_LATENCY_EWMA_ALPHA = 0.2
+
 # Audio Configuration
 AUDIO_FORMAT = pyaudio.paInt16
 AUDIO_CHANNELS = 1
 AUDIO_RATE = 16000
 AUDIO_CHUNK = 1024
+MAX_CAPTURE_SECONDS = 4  # longest clip the amplify scratch buffer is sized for
+AUDIO_CLIP_SECONDS = 3  # recorded per cycle
+AUDIO_CYCLE_SECONDS = 5  # cycle start to cycle start (the rest is not recorded)
+AUDIO_CHUNK_SECONDS = AUDIO_CHUNK / AUDIO_RATE
+AUDIO_RING_CHUNKS = math.ceil(MAX_CAPTURE_SECONDS / AUDIO_CHUNK_SECONDS)
+AUDIO_CHUNK_BYTES = AUDIO_CHUNK * AUDIO_CHANNELS * 2  # paInt16
+AUDIO_STALL_TIMEOUT = 1.0  # seconds past the clip length before giving up on the callback
+
+# Clips are published as 8 kHz G.711 mu-law (1 byte/sample) - a quarter of the
+# captured 16 kHz PCM16; the backend expands it back to PCM16 for browsers
+AUDIO_PUBLISH_RATE = AUDIO_RATE // 2
+ULAW_BIAS = 0x84
+ULAW_CLIP = 32635
+
+
+def downsample_2x(samples):
+    """Halve the sample rate by averaging sample pairs (a simple low-pass before decimating)"""
+    n = samples.size - samples.size % 2
+    return np.add(samples[0:n:2], samples[1:n:2], dtype=np.int32) >> 1
+
+
+def encode_ulaw(samples):
+    """
+    G.711 mu-law encode int32 samples within the int16 range
+    
+    Returns:
+        bytes: One byte per sample
+    """
+    magnitude = np.minimum(np.abs(samples), ULAW_CLIP) + ULAW_BIAS
+    exponent = np.log2(magnitude).astype(np.int32) - 7
+    mantissa = (magnitude >> (exponent + 3)) & 0x0F
+    sign = (samples < 0).astype(np.int32) << 7
+    return (~(sign | (exponent << 4) | mantissa) & 0xFF).astype(np.uint8).tobytes()
+
+
+if numba is not None:
+    @numba.njit(cache=True)
+    def amplify_kernel(samples, gain_q8, out):
+        """Saturating Q8 fixed-point gain from int16 samples into int16 out (one fused pass)"""
+        for i in range(samples.size):
+            value = (np.int32(samples[i]) * gain_q8) >> 8
+            if value > 32767:
+                value = 32767
+            elif value < -32768:
+                value = -32768
+            out[i] = value
+else:
+    amplify_kernel = None
+
+# The JIT kernel writes int16 directly; the numpy path needs int32 headroom
+AMPLIFY_SCRATCH_DTYPE = np.int16 if amplify_kernel is not None else np.int32
+
+
+# Binary message envelope (must match backend/core/aws_mqtt_client.py):
+# magic + 4-byte big-endian header length + JSON header + raw JPEG/audio bytes.
+# Media travels as-is - no base64 on the device and ~25% fewer bytes on the wire.
+PAYLOAD_MAGIC = b'SHB1'
+HEADER_LENGTH = struct.Struct('>I')
+
+# Placeholder marking the per-message timestamp in a header template
+TIMESTAMP_SLOT = "__TIMESTAMP__"
+
+
+def build_header_template(header):
+    """
+    Split a JSON header skeleton into constant byte segments
+    
+    `header` holds TIMESTAMP_SLOT as a string value; a header is then
+    prefix + timestamp + suffix (the ISO timestamp needs no escaping).
+    """
+    prefix, suffix = orjson.dumps(header).split(TIMESTAMP_SLOT.encode('utf-8'))
+    return prefix, suffix
+
+
+def pack_payload(header_prefix, timestamp, header_suffix, data):
+    """Assemble a binary message in a single allocation"""
+    header_length = len(header_prefix) + len(timestamp) + len(header_suffix)
+    return b''.join((
+        PAYLOAD_MAGIC,
+        HEADER_LENGTH.pack(header_length),
+        header_prefix,
+        timestamp,
+        header_suffix,
+        data
+    ))
+
+
+def resolve_cert_paths(config, certs_dir):
+    """
+    Resolve a device's certificate, private key and root CA to absolute path strings
+    
+    Returns:
+        tuple: (cert, key, ca) paths, or None if any file is missing
+    """
+    cert_files = config['certificate_files']
+    paths = tuple(
+        str((certs_dir / cert_files[name]).resolve())
+        for name in ('certificate', 'private_key', 'root_ca')
+    )
+    
+    if not all(os.path.isfile(path) for path in paths):
+        return None
+    
+    return paths
+
+
+def connect_mqtt(config):
+    """
+    Open an mTLS MQTT connection to AWS IoT Core for a device
+    
+    `config` must carry 'cert_paths' as set by check_available_devices.
+    
+    Returns:
+        Connected mqtt.Connection, or None if connecting fails
+    """
+    cert_filepath, key_filepath, ca_filepath = config['cert_paths']
+    
+    try:
+        mqtt_connection = mqtt_connection_builder.mtls_from_path(
+            endpoint=config['aws_iot_endpoint'],
+            cert_filepath=cert_filepath,
+            pri_key_filepath=key_filepath,
+            ca_filepath=ca_filepath,
+            client_id=config['thing_name'],
+            # Live media is worthless once stale - don't have the broker keep a session for it
+            clean_session=True,
+            keep_alive_secs=60
+        )
+        
+        connect_future = mqtt_connection.connect()
+        connect_future.result()
+        
+        return mqtt_connection
+        
+    except Exception as e:
+        return None
+
+
+# Open MQTT connections keyed by (endpoint, client_id) -> [connection, users]
+_shared_connections = {}
+_shared_connections_lock = threading.Lock()
+
+
+def acquire_mqtt(config):
+    """
+    Get a connected MQTT connection for a device identity
+    
+    Devices using the same identity (endpoint + thing name) share one
+    connection - AWS IoT would otherwise drop the older session when the
+    second one connects with the same client ID.
+    
+    Returns:
+        Connected mqtt.Connection, or None if connecting fails
+    """
+    key = (config['aws_iot_endpoint'], config['thing_name'])
+    
+    with _shared_connections_lock:
+        entry = _shared_connections.get(key)
+        
+        if entry is None:
+            mqtt_connection = connect_mqtt(config)
+            if mqtt_connection is None:
+                return None
+            entry = _shared_connections[key] = [mqtt_connection, 0]
+        
+        entry[1] += 1
+        return entry[0]
+
+
+def release_mqtt(mqtt_connection):
+    """Drop one user of a shared connection, disconnecting it when the last user releases it"""
+    with _shared_connections_lock:
+        for key, entry in _shared_connections.items():
+            if entry[0] is mqtt_connection:
+                entry[1] -= 1
+                if entry[1] > 0:
+                    return
+                del _shared_connections[key]
+                break
+    
+    try:
+        disconnect_future = mqtt_connection.disconnect()
+        disconnect_future.result()
+    except Exception:
+        pass
+
+
+class TimestampFormatter:
+    """
+    Local ISO-8601 timestamps as bytes, matching datetime.now().isoformat()
+    
+    The date/time part is formatted once per second and only the microseconds
+    are appended per call. Not thread-safe - use one instance per publisher.
+    """
+    
+    def __init__(self):
+        self._second = None
+        self._second_text = b''
+    
+    def now(self):
+        """Return the current timestamp"""
+        now = time.time()
+        second = int(now)
+        
+        if second != self._second:
+            self._second_text = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(second)).encode('ascii')
+            self._second = second
+        
+        return b'%s.%06d' % (self._second_text, int((now - second) * 1_000_000))
+
+
+def pin_current_thread(cpu_index, realtime_priority=None):
+    """
+    Best-effort: pin the calling thread to one CPU and optionally make it SCHED_FIFO
+    
+    Linux only; does nothing on other platforms, on single-CPU machines, or
+    without CAP_SYS_NICE for the realtime policy. Threads started afterwards
+    inherit the affinity and policy, so call this after spawning helpers.
+    """
+    try:
+        cpus = sorted(os.sched_getaffinity(0))
+        if len(cpus) > 1:
+            os.sched_setaffinity(0, {cpus[cpu_index % len(cpus)]})
+    except (AttributeError, OSError):
+        pass
+    
+    if realtime_priority is not None:
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(realtime_priority))
+        except (AttributeError, OSError):
+            pass
+
+
+def put_latest(work_queue, item):
+    """
+    Queue an item, dropping the oldest one if the queue is full
+    
+    Returns:
+        int: Number of items dropped
+    """
+    dropped = 0
+    while True:
+        try:
+            work_queue.put_nowait(item)
+            return dropped
+        except queue.Full:
+            try:
+                work_queue.get_nowait()
+                dropped += 1
+            except queue.Empty:
+                pass
+
+
+class PipelineStats:
+    """
+    Counters for one device pipeline, logged every STATS_INTERVAL seconds
+    
+    Every counter has a single writer thread (drops are kept per stage for
+    that reason), so plain ints are safe without a lock.
+    """
+    
+    def __init__(self, name, stages):
+        self.name = name
+        self.captured = 0
+        self.published = 0
+        self.dropped = dict.fromkeys(stages, 0)
+        self.publish_ms = 0.0
+        self._next_report = time.monotonic() + STATS_INTERVAL
+    
+    def record_publish(self, started_ns):
+        """Count a successful publish that began at perf_counter_ns() == started_ns"""
+        elapsed_ms = (time.perf_counter_ns() - started_ns) / 1_000_000
+        if self.published == 0:
+            self.publish_ms = elapsed_ms
+        else:
+            self.publish_ms += PUBLISH_LATENCY_EWMA_ALPHA * (elapsed_ms - self.publish_ms)
+        self.published += 1
+    
+    def report_if_due(self, queues):
+        """Log counters and queue depths if STATS_INTERVAL has passed since the last report"""
+        now = time.monotonic()
+        if now < self._next_report:
+            return
+        self._next_report = now + STATS_INTERVAL
+        
+        logger.info(
+            "[%s] captured=%d published=%d dropped=%s publish_ms=%.1f queued=%s",
+            self.name,
+            self.captured,
+            self.published,
+            "/".join(f"{stage}:{count}" for stage, count in self.dropped.items()),
+            self.publish_ms,
+            "/".join(f"{stage}:{work_queue.qsize()}" for stage, work_queue in queues.items())
+        )
 
 
 class CameraDevice:
     """Camera device handler"""
     
-    def __init__(self, config):
+    def __init__(self, config, mqtt_identity=None):
         self.config = config
         self.camera = None
         self.mqtt_connection = None
+        
+        # Config whose identity and certificates are used to connect; defaults to this device's own
+        self.mqtt_identity = mqtt_identity or config
         self.running = False
-        self.frame_count = 0
+        self.stopped = threading.Event()
+        self.stats = PipelineStats("Camera", ("encode", "publish"))
+        self._qos = mqtt.QoS.AT_LEAST_ONCE if "camera" in RELIABLE_PUBLISH else mqtt.QoS.AT_MOST_ONCE
+        
+        # Only the grab thread touches the camera; it leaves the newest frame in this slot
+        self._frame_lock = threading.Lock()
+        self._latest_frame = None
+        
+        # Raw frames waiting to be encoded, and encoded frames waiting to be published
+        self._encode_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        self._publish_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        self._timestamps = TimestampFormatter()
+        
+        # JPEG encoder state
+        self._jpeg = None
+        self.jpeg_quality = JPEG_QUALITY
+        self._jpeg_size_avg = None
+        
+        # Frame headers are constant JSON around the per-frame timestamp
+        self._header_prefix, self._header_suffix = build_header_template({
+            "device_id": config['device_id'],
+            "thing_name": config['thing_name'],
+            "house_id": config['house_id'],
+            "location": config['location'],
+            "timestamp": TIMESTAMP_SLOT,
+            "device_type": "camera",
+            "type": "frame",
+            "payload_field": "image",
+            "metadata": {
+                "resolution": f"{FRAME_WIDTH}x{FRAME_HEIGHT}",
+                "format": "jpeg"
+            }
+        })
         
     def initialize_camera(self):
         """Initialize camera"""
@@ -113,15 +538,35 @@ class CameraDevice:
             if not camera.isOpened():
                 return False
             
+            mjpg = cv2.VideoWriter_fourcc(*'MJPG')
+            camera.set(cv2.CAP_PROP_FOURCC, mjpg)
+            
             camera.set(cv2.CAP_PROP_FRAME_WIDTH, FRAME_WIDTH)
             camera.set(cv2.CAP_PROP_FRAME_HEIGHT, FRAME_HEIGHT)
             
+            # If the driver accepted MJPG, turn conversion off so it hands back the camera's
+            # own JPEG bytes, skipping the decode and our JPEG encode. Other formats keep
+            # conversion on - with it off they would come back as raw YUYV, not BGR.
+            if int(camera.get(cv2.CAP_PROP_FOURCC)) == mjpg:
+                camera.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+            
+            # Keep the driver queue short so we don't read stale frames
+            camera.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            
             ret, frame = camera.read()
             if not ret:
                 camera.release()
                 return False
             
             self.camera = camera
+            
+            # Prefer libjpeg-turbo's SIMD encoder when the library is installed
+            if TurboJPEG is not None:
+                try:
+                    self._jpeg = TurboJPEG()
+                except (OSError, RuntimeError):
+                    self._jpeg = None
+            
             return True
             
         except Exception as e:
@@ -129,86 +574,134 @@ class CameraDevice:
     
     def connect_mqtt(self):
         """Connect to AWS IoT Core"""
-        certs_path = Path("certs/camera")
-        cert_files = self.config['certificate_files']
-        
-        cert_filepath = certs_path / cert_files['certificate']
-        key_filepath = certs_path / cert_files['private_key']
-        ca_filepath = certs_path / cert_files['root_ca']
-        
-        for name, path in [
-            ("Certificate", cert_filepath),
-            ("Private Key", key_filepath),
-            ("Root CA", ca_filepath)
-        ]:
-            if not path.exists():
-                return False
+        self.mqtt_connection = acquire_mqtt(self.mqtt_identity)
         
-        try:
-            self.mqtt_connection = mqtt_connection_builder.mtls_from_path(
-                endpoint=self.config['aws_iot_endpoint'],
-                cert_filepath=str(cert_filepath),
-                pri_key_filepath=str(key_filepath),
-                ca_filepath=str(ca_filepath),
-                client_id=self.config['thing_name'],
-                clean_session=False,
-                keep_alive_secs=30
-            )
-            
-            connect_future = self.mqtt_connection.connect()
-            connect_future.result()
-            
-            print("✅ [Camera] Connected to AWS IoT Core!")
-            return True
-            
-        except Exception as e:
+        if self.mqtt_connection is None:
             return False
+        
+        logger.info("✅ [Camera] Connected to AWS IoT Core!")
+        return True
     
-    def capture_and_encode_frame(self):
-        """Capture frame and encode to base64"""
-        ret, frame = self.camera.read()
+    def _grab_loop(self):
+        """Read frames as fast as the camera delivers them and keep only the newest in the slot"""
+        pin_current_thread(CAMERA_CPU, CAMERA_RT_PRIORITY)
         
-        if not ret:
-            return None
+        while self.running:
+            # grab() blocks until the next frame, draining the driver queue
+            if not self.camera.grab():
+                time.sleep(GRAB_RETRY_DELAY)
+                continue
+            
+            ret, frame = self.camera.retrieve()
+            if ret:
+                with self._frame_lock:
+                    self._latest_frame = frame
+    
+    def capture_frame(self):
+        """
+        Take the freshest frame (BGR, or a 1xN JPEG byte buffer in MJPG passthrough)
         
-        encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), 70]
-        success, encoded_image = cv2.imencode('.jpg', frame, encode_param)
+        Never waits on the camera. Returns None if no new frame arrived since the last call.
+        """
+        with self._frame_lock:
+            frame, self._latest_frame = self._latest_frame, None
         
-        if not success:
-            return None
+        return frame
+    
+    def encode_frame(self, frame):
+        """Encode frame to JPEG"""
+        if frame.ndim < 3:
+            # Already JPEG from the camera (V4L2 returns it as a 1xN Mat) - publish
+            # as-is unless it's over the size budget
+            frame = frame.reshape(-1)
+            if frame.size <= JPEG_TARGET_BYTES:
+                return frame
+            
+            frame = cv2.imdecode(frame, cv2.IMREAD_COLOR)
+            if frame is None:
+                return None
+        
+        if self._jpeg is not None:
+            # 4:2:0 chroma subsampling, same as cv2's default (PyTurboJPEG defaults to 4:2:2)
+            encoded_image = self._jpeg.encode(
+                frame,
+                quality=self.jpeg_quality,
+                pixel_format=TJPF_BGR,
+                jpeg_subsample=TJSAMP_420
+            )
+        else:
+            success, encoded_image = cv2.imencode(
+                '.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality]
+            )
+            
+            if not success:
+                return None
         
-        return base64.b64encode(encoded_image.tobytes()).decode('utf-8')
+        self._adapt_quality(len(encoded_image))
+        
+        return encoded_image
+    
+    def _adapt_quality(self, jpeg_size):
+        """Step JPEG quality down when frames approach the size budget, and back up when well under"""
+        if self._jpeg_size_avg is None:
+            self._jpeg_size_avg = jpeg_size
+        else:
+            self._jpeg_size_avg += JPEG_SIZE_EWMA_ALPHA * (jpeg_size - self._jpeg_size_avg)
+        
+        if self._jpeg_size_avg > JPEG_TARGET_BYTES and self.jpeg_quality > JPEG_MIN_QUALITY:
+            self.jpeg_quality = max(JPEG_MIN_QUALITY, self.jpeg_quality - JPEG_QUALITY_STEP)
+        elif self._jpeg_size_avg < JPEG_TARGET_BYTES * 0.6 and self.jpeg_quality < JPEG_QUALITY:
+            self.jpeg_quality = min(JPEG_QUALITY, self.jpeg_quality + JPEG_QUALITY_STEP)
     
     def publish_frame(self, video_data):
-        """Publish video frame to AWS IoT Core"""
-        payload = {
-            "device_id": self.config['device_id'],
-            "thing_name": self.config['thing_name'],
-            "house_id": self.config['house_id'],
-            "location": self.config['location'],
-            "timestamp": datetime.now().isoformat(),
-            "device_type": "camera",
-            "type": "frame",
-            "image": video_data,
-            "metadata": {
-                "resolution": f"{FRAME_WIDTH}x{FRAME_HEIGHT}",
-                "format": "jpeg"
-            }
-        }
+        """
+        Publish video frame (JPEG buffer) to AWS IoT Core
+        
+        Frames go out at QoS 0 - they are superseded every second, so no PUBACK
+        round trip is worth waiting for - unless RELIABLE_PUBLISH lists "camera".
+        """
+        payload = pack_payload(self._header_prefix, self._timestamps.now(), self._header_suffix, video_data)
         
         try:
+            started_ns = time.perf_counter_ns()
             self.mqtt_connection.publish(
                 topic=self.config['mqtt_topic'],
-                payload=json.dumps(payload),
-                qos=mqtt.QoS.AT_LEAST_ONCE
+                payload=payload,
+                qos=self._qos
             )
             
-            self.frame_count += 1
+            self.stats.record_publish(started_ns)
+            logger.debug("[Camera] Published frame #%d (%.1f KB)", self.stats.published, len(payload) / 1024)
             return True
             
         except Exception as e:
+            logger.debug("[Camera] Publish failed: %s", e)
             return False
     
+    def _encoder_loop(self):
+        """Encode captured frames (the JPEG encoders release the GIL while encoding)"""
+        pin_current_thread(CAMERA_ENCODER_CPU, CAMERA_RT_PRIORITY)
+        
+        while self.running:
+            try:
+                frame = self._encode_queue.get(timeout=PIPELINE_POLL_TIMEOUT)
+            except queue.Empty:
+                continue
+            
+            video_data = self.encode_frame(frame)
+            if video_data is not None:
+                self.stats.dropped["publish"] += put_latest(self._publish_queue, video_data)
+    
+    def _publisher_loop(self):
+        """Publish encoded frames so network latency never stalls capture"""
+        while self.running:
+            try:
+                video_data = self._publish_queue.get(timeout=PIPELINE_POLL_TIMEOUT)
+            except queue.Empty:
+                continue
+            
+            self.publish_frame(video_data)
+    
     def run(self):
         """Main camera loop"""
         if not self.initialize_camera():
@@ -220,18 +713,43 @@ class CameraDevice:
         
         self.running = True
         
+        workers = [
+            threading.Thread(target=self._grab_loop, name="CameraGrabber", daemon=True),
+            threading.Thread(target=self._encoder_loop, name="CameraEncoder", daemon=True),
+            threading.Thread(target=self._publisher_loop, name="CameraPublisher", daemon=True)
+        ]
+        for worker in workers:
+            worker.start()
+        
         try:
+            # Fixed-rate schedule: capture time doesn't stretch the interval
+            next_capture = time.monotonic()
+            
             while self.running:
-                video_data = self.capture_and_encode_frame()
-                if video_data:
-                    self.publish_frame(video_data)
-                time.sleep(CAPTURE_INTERVAL)
+                # Capture only; stale frames are dropped if encoding falls behind
+                frame = self.capture_frame()
+                if frame is not None:
+                    self.stats.captured += 1
+                    self.stats.dropped["encode"] += put_latest(self._encode_queue, frame)
+                
+                self.stats.report_if_due({"encode": self._encode_queue, "publish": self._publish_queue})
+                
+                next_capture += CAPTURE_INTERVAL
+                delay = next_capture - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    # Fell behind - resync rather than burst to catch up
+                    next_capture = time.monotonic()
                 
         except KeyboardInterrupt:
             pass
         except Exception as e:
             pass
         finally:
+            self.running = False
+            for worker in workers:
+                worker.join(timeout=PIPELINE_POLL_TIMEOUT * 2)
             self.cleanup()
     
     def cleanup(self):
@@ -240,33 +758,61 @@ class CameraDevice:
             self.camera.release()
         
         if self.mqtt_connection is not None:
-            try:
-                disconnect_future = self.mqtt_connection.disconnect()
-                disconnect_future.result()
-            except:
-                pass
+            release_mqtt(self.mqtt_connection)
+            self.mqtt_connection = None
 
 
 class MicrophoneDevice:
     """Microphone device handler"""
     
-    def __init__(self, config):
+    def __init__(self, config, mqtt_identity=None):
         self.config = config
         self.audio = None
         self.stream = None
         self.mqtt_connection = None
+        
+        # Config whose identity and certificates are used to connect; defaults to this device's own
+        self.mqtt_identity = mqtt_identity or config
         self.running = False
-        self.audio_count = 0
+        self.stopped = threading.Event()
+        self.stats = PipelineStats("Microphone", ("publish",))
+        self._qos = mqtt.QoS.AT_LEAST_ONCE if "microphone" in RELIABLE_PUBLISH else mqtt.QoS.AT_MOST_ONCE
+        self._amp_scratch = None
+        self._audio_buf = None
+        self._timestamps = TimestampFormatter()
+        
+        # Chunks pushed by PortAudio's callback thread (deque ops are thread-safe)
+        self._ring = collections.deque(maxlen=AUDIO_RING_CHUNKS)
+        
+        # Captured clips waiting to be published
+        self._publish_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        
+        # Audio headers are constant JSON around the per-clip timestamp
+        self._header_prefix, self._header_suffix = build_header_template({
+            "device_id": config['device_id'],
+            "thing_name": config['thing_name'],
+            "house_id": config['house_id'],
+            "location": config['location'],
+            "timestamp": TIMESTAMP_SLOT,
+            "device_type": "microphone",
+            "type": "frame",
+            "payload_field": "audio",
+            "audio": {
+                "sample_rate": AUDIO_PUBLISH_RATE,
+                "channels": AUDIO_CHANNELS,
+                "format": "ulaw8"
+            }
+        })
         
     def initialize_microphone(self):
         """Initialize microphone"""
-        print(f"\n� [Microphone] Initializing...")
+        logger.info("🎤 [Microphone] Initializing...")
         
         try:
             audio = pyaudio.PyAudio()
             
             default_input = audio.get_default_input_device_info()
-            print(f"   Using: {default_input['name']}")
+            logger.info("   Using: %s", default_input['name'])
             
             stream = audio.open(
                 format=AUDIO_FORMAT,
@@ -274,120 +820,150 @@ class MicrophoneDevice:
                 rate=AUDIO_RATE,
                 input=True,
                 input_device_index=default_input['index'],
-                frames_per_buffer=AUDIO_CHUNK
+                frames_per_buffer=AUDIO_CHUNK,
+                stream_callback=self._audio_callback
             )
             
-            # Test recording
-            test_data = stream.read(AUDIO_CHUNK, exception_on_overflow=False)
-            print(f"   Test: captured {len(test_data)} bytes")
+            # Test recording - wait for the callback to deliver a chunk
+            deadline = time.monotonic() + 1.0
+            while not self._ring and time.monotonic() < deadline:
+                time.sleep(AUDIO_CHUNK_SECONDS)
+            if not self._ring:
+                raise RuntimeError("no audio received from input device")
+            logger.info("   Test: captured %d bytes", len(self._ring[-1]))
             
             self.audio = audio
             self.stream = stream
-            print(f"✅ [Microphone] Initialized - {AUDIO_RATE}Hz, {AUDIO_CHANNELS} channel(s)")
+            
+            # Clip assembly buffer and amplification scratch, reused for every clip
+            self._audio_buf = bytearray(AUDIO_RING_CHUNKS * AUDIO_CHUNK_BYTES)
+            self._amp_scratch = np.empty(AUDIO_RATE * MAX_CAPTURE_SECONDS, dtype=AMPLIFY_SCRATCH_DTYPE)
+            logger.info("✅ [Microphone] Initialized - %dHz, %d channel(s)", AUDIO_RATE, AUDIO_CHANNELS)
             return True
             
         except Exception as e:
-            print(f"❌ [Microphone] Initialization error: {e}")
+            logger.error("❌ [Microphone] Initialization error: %s", e)
             if 'audio' in locals():
                 audio.terminate()
             return False
     
     def connect_mqtt(self):
         """Connect to AWS IoT Core"""
-        certs_path = Path("certs/microphone")
-        cert_files = self.config['certificate_files']
-        
-        cert_filepath = certs_path / cert_files['certificate']
-        key_filepath = certs_path / cert_files['private_key']
-        ca_filepath = certs_path / cert_files['root_ca']
-        
-        for name, path in [
-            ("Certificate", cert_filepath),
-            ("Private Key", key_filepath),
-            ("Root CA", ca_filepath)
-        ]:
-            if not path.exists():
-                return False
+        self.mqtt_connection = acquire_mqtt(self.mqtt_identity)
         
-        try:
-            self.mqtt_connection = mqtt_connection_builder.mtls_from_path(
-                endpoint=self.config['aws_iot_endpoint'],
-                cert_filepath=str(cert_filepath),
-                pri_key_filepath=str(key_filepath),
-                ca_filepath=str(ca_filepath),
-                client_id=self.config['thing_name'],
-                clean_session=False,
-                keep_alive_secs=30
-            )
-            
-            connect_future = self.mqtt_connection.connect()
-            connect_future.result()
-            
-            print("✅ [Microphone] Connected to AWS IoT Core!")
-            return True
-            
-        except Exception as e:
+        if self.mqtt_connection is None:
             return False
+        
+        logger.info("✅ [Microphone] Connected to AWS IoT Core!")
+        return True
+    
+    def _audio_callback(self, in_data, frame_count, time_info, status):
+        """PortAudio stream callback - runs on PortAudio's thread, just queues the chunk"""
+        self._ring.append(in_data)
+        return (None, pyaudio.paContinue)
     
     def capture_audio(self, duration_sec=1, amplify=5.0):
         """Capture audio for specified duration with amplification"""
         try:
-            frames = []
-            chunks_to_record = int(AUDIO_RATE / AUDIO_CHUNK * duration_sec)
+            # The ring only holds MAX_CAPTURE_SECONDS of audio
+            chunks_to_record = min(int(AUDIO_RATE / AUDIO_CHUNK * duration_sec), AUDIO_RING_CHUNKS)
             
+            # Start from fresh audio and let the callback fill the ring while we sleep
+            self._ring.clear()
+            record_seconds = chunks_to_record * AUDIO_CHUNK_SECONDS
+            deadline = time.monotonic() + record_seconds + AUDIO_STALL_TIMEOUT
+            time.sleep(record_seconds)
+            
+            # Give up if the callback stalls (device unplugged, stream error) or we're stopping
+            while len(self._ring) < chunks_to_record:
+                if not self.running or time.monotonic() >= deadline:
+                    return None
+                time.sleep(AUDIO_CHUNK_SECONDS)
+            
+            # Copy chunks into the reused buffer instead of building a list and joining
+            buffer = self._audio_buf
+            offset = 0
             for _ in range(chunks_to_record):
-                data = self.stream.read(AUDIO_CHUNK, exception_on_overflow=False)
-                frames.append(data)
+                chunk = self._ring.popleft()
+                buffer[offset:offset + len(chunk)] = chunk
+                offset += len(chunk)
             
-            audio_data = b''.join(frames)
+            # Samples straight from the buffer, no intermediate bytes
+            samples = np.frombuffer(memoryview(buffer)[:offset], dtype=np.int16)
             
             # Amplify audio
             if amplify != 1.0:
-                import numpy as np
-                audio_array = np.frombuffer(audio_data, dtype=np.int16)
-                
-                rms = np.sqrt(np.mean(audio_array**2))
-                max_val = np.max(np.abs(audio_array))
-                
-                amplified = (audio_array * amplify).astype(np.int16)
-                amplified = np.clip(amplified, -32768, 32767)
-                
-                audio_data = amplified.tobytes()
+                samples = self._amplify(samples, amplify)
             
-            return base64.b64encode(audio_data).decode('utf-8')
+            # Encoding produces new bytes, so the buffer is free for the next clip
+            return encode_ulaw(downsample_2x(samples))
             
         except Exception as e:
             return None
     
+    def _amplify(self, audio_array, amplify):
+        """
+        Apply gain to int16 samples with saturation
+        
+        Uses a Q8 fixed-point gain in a preallocated scratch buffer, so no
+        float64 temporaries are created. With Numba installed this is a single
+        compiled loop; otherwise three in-place numpy ufuncs.
+        
+        Returns a view of the scratch buffer (int16, or int32 already clipped
+        to the int16 range), valid until the next call.
+        """
+        n = audio_array.size
+        if self._amp_scratch is None or self._amp_scratch.size < n:
+            self._amp_scratch = np.empty(n, dtype=AMPLIFY_SCRATCH_DTYPE)
+        
+        scratch = self._amp_scratch[:n]
+        gain_q8 = int(round(amplify * 256))
+        
+        if amplify_kernel is not None:
+            amplify_kernel(audio_array, gain_q8, scratch)
+            return scratch
+        
+        np.multiply(audio_array, gain_q8, out=scratch, dtype=np.int32)
+        np.right_shift(scratch, 8, out=scratch)
+        
+        # Attenuation (|gain| <= 1) can't leave the int16 range, so only gain needs clipping
+        if abs(gain_q8) > 256:
+            np.clip(scratch, -32768, 32767, out=scratch)
+        
+        return scratch
+    
+    def _publisher_loop(self):
+        """Publish captured clips so network latency never delays the next capture"""
+        while self.running:
+            try:
+                audio_data = self._publish_queue.get(timeout=PIPELINE_POLL_TIMEOUT)
+            except queue.Empty:
+                continue
+            
+            self.publish_audio(audio_data)
+    
     def publish_audio(self, audio_data):
-        """Publish audio to AWS IoT Core"""
-        payload = {
-            "device_id": self.config['device_id'],
-            "thing_name": self.config['thing_name'],
-            "house_id": self.config['house_id'],
-            "location": self.config['location'],
-            "timestamp": datetime.now().isoformat(),
-            "device_type": "microphone",
-            "type": "frame",
-            "audio": {
-                "data": audio_data,
-                "sample_rate": AUDIO_RATE,
-                "channels": AUDIO_CHANNELS,
-                "format": "pcm16"
-            }
-        }
+        """
+        Publish audio (mu-law bytes) to AWS IoT Core
+        
+        Clips go out at QoS 0 like frames, unless RELIABLE_PUBLISH lists "microphone".
+        """
+        payload = pack_payload(self._header_prefix, self._timestamps.now(), self._header_suffix, audio_data)
         
         try:
+            started_ns = time.perf_counter_ns()
             self.mqtt_connection.publish(
                 topic=self.config['mqtt_topic'],
-                payload=json.dumps(payload),
-                qos=mqtt.QoS.AT_LEAST_ONCE
+                payload=payload,
+                qos=self._qos
             )
             
-            self.audio_count += 1
+            self.stats.record_publish(started_ns)
+            logger.debug("[Microphone] Published clip #%d (%.1f KB)", self.stats.published, len(payload) / 1024)
             return True
             
         except Exception as e:
+            logger.debug("[Microphone] Publish failed: %s", e)
             return False
     
     def run(self):
@@ -401,21 +977,40 @@ class MicrophoneDevice:
         
         self.running = True
         
+        publisher = threading.Thread(target=self._publisher_loop, name="MicrophonePublisher", daemon=True)
+        publisher.start()
+        
+        # Keep the microphone loop off the camera's CPU
+        pin_current_thread(MICROPHONE_CPU)
+        
         try:
+            # Cycles start every AUDIO_CYCLE_SECONDS regardless of capture/publish time
+            next_cycle = time.monotonic()
+            
             while self.running:
                 # Record 3 seconds of audio
-                audio_data = self.capture_audio(duration_sec=3, amplify=5.0)
+                audio_data = self.capture_audio(duration_sec=AUDIO_CLIP_SECONDS, amplify=5.0)
                 if audio_data:
-                    self.publish_audio(audio_data)
+                    self.stats.captured += 1
+                    self.stats.dropped["publish"] += put_latest(self._publish_queue, audio_data)
+                
+                self.stats.report_if_due({"publish": self._publish_queue})
                 
-                # Ignore the next 2 seconds (don't record)
-                time.sleep(2)
+                # Don't record for the rest of the cycle
+                next_cycle += AUDIO_CYCLE_SECONDS
+                delay = next_cycle - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_cycle = time.monotonic()
                 
         except KeyboardInterrupt:
             pass
         except Exception as e:
             pass
         finally:
+            self.running = False
+            publisher.join(timeout=PIPELINE_POLL_TIMEOUT * 2)
             self.cleanup()
     
     def cleanup(self):
@@ -423,20 +1018,21 @@ class MicrophoneDevice:
         if self.stream is not None:
             self.stream.stop_stream()
             self.stream.close()
+            self.stream = None
         
         if self.audio is not None:
             self.audio.terminate()
+            self.audio = None
         
         if self.mqtt_connection is not None:
-            try:
-                disconnect_future = self.mqtt_connection.disconnect()
-                disconnect_future.result()
-            except:
-                pass
+            release_mqtt(self.mqtt_connection)
+            self.mqtt_connection = None
 
 
 def main():
     """Main function - Starts all available devices"""
+    setup_logging()
+    
     print("=" * 70)
     print("🎥🎤 Smart IoT Device Manager")
     print("=" * 70)
@@ -451,12 +1047,20 @@ def main():
         threads = []
         devices = []
         
+        # Optionally publish both devices over the camera's connection
+        # (its IoT policy must allow publishing to the microphone topic too)
+        share_connection = (
+            os.environ.get("SHARED_MQTT_CONNECTION") == "1"
+            and 'camera' in available_devices
+            and 'microphone' in available_devices
+        )
+        
         # Start camera device if configured
         if 'camera' in available_devices:
             global camera_device
             camera_device = CameraDevice(available_devices['camera'])
             devices.append(camera_device)
-            cam_thread = threading.Thread(target=camera_device.run, name="Camera")
+            cam_thread = threading.Thread(target=run_device, args=(camera_device,), name="Camera")
             cam_thread.daemon = True
             threads.append(cam_thread)
             print(f"   📹 Camera device ready")
@@ -464,9 +1068,12 @@ def main():
         # Start microphone device if configured
         if 'microphone' in available_devices:
             global microphone_device
-            microphone_device = MicrophoneDevice(available_devices['microphone'])
+            microphone_device = MicrophoneDevice(
+                available_devices['microphone'],
+                mqtt_identity=available_devices['camera'] if share_connection else None
+            )
             devices.append(microphone_device)
-            mic_thread = threading.Thread(target=microphone_device.run, name="Microphone")
+            mic_thread = threading.Thread(target=run_device, args=(microphone_device,), name="Microphone")
             mic_thread.daemon = True
             threads.append(mic_thread)
             print(f"   🎤 Microphone device ready")
@@ -481,17 +1088,12 @@ def main():
             thread.start()
             time.sleep(0.5)  # Small delay between starts
         
-        # Wait for all threads
-        try:
-            while True:
-                # Check if any thread is still alive
-                alive = any(t.is_alive() for t in threads)
-                if not alive:
-                    print("\n⚠️  All device threads stopped")
-                    break
-                time.sleep(1)
-                
-        except KeyboardInterrupt:
+        # Sleep until a shutdown signal arrives or every device stops on its own
+        shutdown_event.wait()
+        
+        if all(device.stopped.is_set() for device in devices):
+            print("\n⚠️  All device threads stopped")
+        else:
             print("\n\n🛑 Shutdown signal received")
             
             # Stop all devices